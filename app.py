@@ -1,16 +1,80 @@
 import asyncio
 import json
-import random
+import os
 import time
+from collections import deque
+from contextlib import asynccontextmanager
 from typing import Dict, List
 
+import orjson
+from websockets.exceptions import WebSocketException
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import PlainTextResponse
 from starlette.staticfiles import StaticFiles
 from starlette.websockets import WebSocketDisconnect, WebSocketState
 
-from game import Game, InvalidMove, BotMove
-
-app = FastAPI()
+from bot_engine import BotEngine
+from bot_scheduler import BotScheduler
+from game import Game, InvalidMove, iter_cells
+from ids import IdAllocator
+from metrics import (BOT_THINK_SECONDS, GAME_STATE_ENCODE_SECONDS, GAME_STATE_FANOUT_SECONDS,
+                     WEBSOCKET_MESSAGE_SECONDS, EVENT_LOOP_LAG_SECONDS, GAME_ROOMS, CONNECTED_PLAYERS, BOTS,
+                     PENDING_TASKS, PENDING_TIMERS, BOT_QUEUE_DEPTH, BOT_MOVES_RUNNING, OUTBOUND_QUEUED_FRAMES,
+                     OUTBOUND_FRAMES_DROPPED, SLOW_CLIENTS_DISCONNECTED, SPECTATORS, generate_latest,
+                     monitor_event_loop_lag)
+from room_log import RoomLog
+from search import DIFFICULTIES
+from sharding import InMemoryRegistry, SocketRegistry, proxy_websocket
+from spectators import SpectatorStream
+from timers import TimerWheel
+from wire import BINARY_SUBPROTOCOL, encode_game_state, encode_game_delta, decode_client_frame
+
+bot_engine = BotEngine(workers=int(os.environ.get("BOT_WORKERS", 0)),
+                       timeout=float(os.environ.get("BOT_TIMEOUT", 5)),
+                       cache_size=int(os.environ.get("BOT_CACHE_SIZE", 1 << 16)),
+                       max_think_time=float(os.environ.get("BOT_MAX_THINK_TIME", 2)),
+                       max_nodes=int(os.environ["BOT_MAX_NODES"]) if "BOT_MAX_NODES" in os.environ else None)
+registry = SocketRegistry(os.environ["SHARD_REGISTRY"]) if "SHARD_REGISTRY" in os.environ else InMemoryRegistry()
+room_log = RoomLog(os.environ["ROOM_LOG_DIR"],
+                   flush_interval=float(os.environ.get("ROOM_LOG_FLUSH_INTERVAL", 0.05)),
+                   compact_bytes=int(os.environ.get("ROOM_LOG_COMPACT_BYTES", 1 << 24))) \
+    if "ROOM_LOG_DIR" in os.environ else None
+timer_wheel = TimerWheel()
+bot_scheduler = BotScheduler(timer_wheel,
+                             max_concurrent=int(os.environ.get("BOT_MAX_CONCURRENT", bot_engine.workers)),
+                             pacing_delay=float(os.environ.get("BOT_PACING_DELAY", 1)),
+                             max_queue=int(os.environ.get("BOT_MAX_QUEUE", 64)))
+PONDER_MOVES = int(os.environ.get("BOT_PONDER_MOVES", 0))
+OUTBOUND_QUEUE_SIZE = int(os.environ.get("OUTBOUND_QUEUE_SIZE", 32))
+OUTBOUND_SEND_TIMEOUT = float(os.environ.get("OUTBOUND_SEND_TIMEOUT", 10))
+SPECTATOR_DELAY = float(os.environ.get("SPECTATOR_DELAY", 0))
+SPECTATOR_INTERVAL = float(os.environ.get("SPECTATOR_INTERVAL", 0))
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    bot_engine.start()
+    if room_log is not None:
+        await manager.restore_game_rooms()
+    await manager.register_shard()
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag(EVENT_LOOP_LAG_SECONDS))
+    shard_heartbeat = asyncio.create_task(manager.keep_shard_registered())
+    yield
+    lag_monitor.cancel()
+    shard_heartbeat.cancel()
+    bot_scheduler.stop()
+    timer_wheel.stop()
+    try:
+        await registry.remove_shard(manager.shard_id)
+    except ConnectionError:
+        pass
+    await registry.close()
+    if room_log is not None:
+        await room_log.close()
+    bot_engine.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class InvalidWebSocketAction(Exception):
@@ -18,17 +82,27 @@ class InvalidWebSocketAction(Exception):
 
 
 class PlayerConnection:
-    user_id_set = set()
+    by_user_id: Dict[str, "PlayerConnection"] = {}
+    user_ids = IdAllocator(by_user_id)
 
-    def __init__(self, websocket, is_bot=False):
+    def __init__(self, websocket, is_bot=False, binary=False):
         self.websocket = websocket
+        self.binary = binary
         self.game_id = None
+        self.spectating = None
         self.user_id = None
         self.color = 0
         self.is_bot = is_bot
         self.name = "Bot" if is_bot else None
         self._connected = not is_bot
         self.websocket_last_state_change_time = time.time()
+        self.sent_identity = None
+        self.bot_timer = None
+        self.outbound = deque()
+        self.outbound_ready = asyncio.Event()
+        self.pending_state = None
+        self.closing = False
+        self.writer = None
 
     @property
     def connected(self):
@@ -40,29 +114,113 @@ class PlayerConnection:
         self.websocket_last_state_change_time = time.time()
 
     def assign_random_user_id(self):
-        generate = lambda: "".join([str(random.randint(0, 9)) for _ in range(8)])
-        user_id = generate()
-        while user_id in self.user_id_set:
-            user_id = generate()
-        self.user_id = user_id
-        PlayerConnection.user_id_set.add(user_id)
+        self.user_id = PlayerConnection.user_ids.allocate()
+        PlayerConnection.by_user_id[self.user_id] = self
+
+    def release_user_id(self):
+        if PlayerConnection.by_user_id.get(self.user_id) is self:
+            del PlayerConnection.by_user_id[self.user_id]
+
+    def send_identity(self):
+        identity = (self.user_id, self.color)
+        if self.sent_identity == identity:
+            return
+        self.sent_identity = identity
+        self.send(orjson.dumps({"type": "identity", "user_id": self.user_id, "color": self.color}).decode())
+
+    def send(self, frame):
+        if self.websocket is None or self.closing:
+            return
+        if len(self.outbound) >= OUTBOUND_QUEUE_SIZE:
+            self.drop_slow_client("queue_full")
+            return
+        self.outbound.append(frame)
+        self.outbound_ready.set()
+        if self.writer is None:
+            self.writer = asyncio.create_task(self.write_outbound(self.websocket))
+
+    def send_state(self, frame, snapshot_frame):
+        if self.pending_state is not None:
+            self.outbound.remove(self.pending_state)
+            self.pending_state = None
+            OUTBOUND_FRAMES_DROPPED.inc()
+            frame = snapshot_frame
+        self.send_identity()
+        self.send(frame)
+        if len(self.outbound) > 0 and self.outbound[-1] is frame:
+            self.pending_state = frame
+
+    async def write_outbound(self, websocket):
+        while not self.closing or self.outbound:
+            if not self.outbound:
+                self.outbound_ready.clear()
+                await self.outbound_ready.wait()
+                continue
+            frame = self.outbound.popleft()
+            if frame is self.pending_state:
+                self.pending_state = None
+            try:
+                send = websocket.send_bytes(frame) if type(frame) is bytes else websocket.send_text(frame)
+                await asyncio.wait_for(send, OUTBOUND_SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.writer = None
+                self.drop_slow_client("send_timeout")
+                return
+            except (RuntimeError, OSError, WebSocketDisconnect):
+                self.closing = True
+                self.outbound.clear()
+                return
+
+    def drop_slow_client(self, reason):
+        SLOW_CLIENTS_DISCONNECTED.inc(reason)
+        self.closing = True
+        self.outbound.clear()
+        self.pending_state = None
+        if self.writer is not None:
+            self.writer.cancel()
+            self.writer = None
+        # noinspection PyAsyncCall
+        asyncio.create_task(self.close_connection())
+
+    def stop_writer(self):
+        if self.writer is not None:
+            self.writer.cancel()
+            self.writer = None
 
     async def close_connection(self):
+        if self.writer is not None:
+            self.closing = True
+            self.outbound_ready.set()
+            await asyncio.wait([self.writer], timeout=OUTBOUND_SEND_TIMEOUT)
+            self.stop_writer()
         try:
             await self.websocket.close()
         except RuntimeError:
             pass
         except AttributeError:
             pass
+        except WebSocketDisconnect:
+            pass
 
 
 class GameRoom:
+    BOT_TAKEOVER_DELAY = 10
+    DELETE_DELAY = 12
+
     def __init__(self, game_id: str):
         self.game_id = game_id
         self.game = None
         self.connections: List[PlayerConnection] = []
         self.status = 0
+        self.difficulty = "easy"
+        self.seq = 0
+        self.last_masks = None
+        self.last_connections = []
         self.to_be_deleted = False
+        self.delete_timer = None
+        self.ponder_task = None
+        self.ponder_replies = {}
+        self.spectators = SpectatorStream(timer_wheel, SPECTATOR_DELAY, SPECTATOR_INTERVAL)
 
     def start_game(self):
         if self.to_be_deleted:
@@ -85,22 +243,19 @@ class GameRoom:
     async def reconnect_connection(self, connection: PlayerConnection, user_id):
         if self.to_be_deleted:
             return
-        for c in self.connections:
-            if c.user_id == user_id:
-                connection.game_id = c.game_id
-                connection.user_id = c.user_id
-                connection.color = c.color
-                connection.name = c.name
-                connection.connected = True
-                try:
-                    await manager.send_status_message(c, "Another connection has been established with the same user_id!")
-                except AttributeError:
-                    pass
-                await c.close_connection()
-                self.connections.remove(c)
-                self.connections.append(connection)
-                return
-        raise InvalidWebSocketAction("user_id does not match any player")
+        c = PlayerConnection.by_user_id.get(user_id) if type(user_id) is str else None
+        if c is None or c.game_id != self.game_id or c not in self.connections:
+            raise InvalidWebSocketAction("user_id does not match any player")
+        connection.game_id = c.game_id
+        connection.user_id = c.user_id
+        connection.color = c.color
+        connection.name = c.name
+        connection.connected = True
+        await manager.send_status_message(c, "Another connection has been established with the same user_id!")
+        await c.close_connection()
+        timer_wheel.cancel(c.bot_timer)
+        self.connections[self.connections.index(c)] = connection
+        PlayerConnection.by_user_id[user_id] = connection
 
     async def disconnect_connection(self, connection: PlayerConnection):
         if self.to_be_deleted:
@@ -110,18 +265,15 @@ class GameRoom:
         await connection.close_connection()
         connection.connected = False
         connection.websocket = None
+        timer_wheel.cancel(connection.bot_timer)
+        connection.bot_timer = timer_wheel.schedule(self.BOT_TAKEOVER_DELAY, self.turn_into_bot, connection)
 
-        async def check_connection_and_turn_into_bot():
-            prev_time = connection.websocket_last_state_change_time
-            await asyncio.sleep(10)
-            if prev_time == connection.websocket_last_state_change_time and not connection.is_bot:
-                connection.is_bot = True
-                if self.game.players[self.game.turn] == connection.color:
-                    # noinspection PyAsyncCall
-                    asyncio.create_task(self.check_bot_move())
-
-        # noinspection PyAsyncCall
-        asyncio.create_task(check_connection_and_turn_into_bot())
+    def turn_into_bot(self, connection: PlayerConnection):
+        if self.to_be_deleted or connection not in self.connections or connection.is_bot:
+            return
+        connection.is_bot = True
+        manager.log_event(self.game_id, "bot", connection.user_id)
+        self.check_bot_move()
 
     async def remove_connection(self, connection: PlayerConnection):
         if self.to_be_deleted:
@@ -130,6 +282,7 @@ class GameRoom:
             return
         await connection.close_connection()
         self.connections.remove(connection)
+        connection.release_user_id()
         connection.websocket = None
 
     def select_color(self, connection: PlayerConnection, color: int):
@@ -167,118 +320,372 @@ class GameRoom:
                 self.connections.remove(c)
                 return
 
-    async def check_bot_move(self):
-        if self.to_be_deleted:
+    def needs_bot_move(self):
+        if self.to_be_deleted or self.game is None or self.game.get_winner():
+            return False
+        current_color = self.game.players[self.game.turn]
+        return any(connection.color == current_color and connection.is_bot for connection in self.connections)
+
+    def has_connected_humans(self):
+        return any(connection.connected and not connection.is_bot for connection in self.connections)
+
+    def check_bot_move(self):
+        if self.needs_bot_move():
+            bot_scheduler.request(self)
+        elif PONDER_MOVES > 0:
+            self.start_pondering()
+
+    def start_pondering(self):
+        self.stop_pondering()
+        if self.to_be_deleted or self.game is None or self.game.get_winner() or not bot_scheduler.can_ponder(self):
             return
-        assert self.game is not None
-        if self.game.get_winner():
+        next_color = self.game.players[(self.game.turn + 1) % self.game.num_players]
+        if not any(connection.color == next_color and connection.is_bot for connection in self.connections):
+            return
+        self.ponder_replies = {}
+        self.ponder_task = asyncio.create_task(bot_engine.ponder(self.game, DIFFICULTIES[self.difficulty], PONDER_MOVES,
+                                                                 self.ponder_replies, bot_scheduler))
+
+    def stop_pondering(self):
+        if self.ponder_task is not None:
+            self.ponder_task.cancel()
+            self.ponder_task = None
+
+    async def play_bot_move(self, degraded=False):
+        if not self.needs_bot_move():
             return
         current_color = self.game.players[self.game.turn]
-        needs_bot_move = False
-        for connection in self.connections:
-            needs_bot_move |= (connection.color == current_color and connection.is_bot)
-        if not needs_bot_move:
+        moves = self.ponder_replies.get((self.game.hash, self.game.turn))
+        self.ponder_replies = {}
+        if moves is None:
+            time_budget = None if degraded else DIFFICULTIES[self.difficulty]
+            with BOT_THINK_SECONDS.labels(self.difficulty).time():
+                moves = await bot_engine.get_best_move(self.game, time_budget)
+        if self.to_be_deleted or current_color != self.game.players[self.game.turn]:
             return
-        await asyncio.sleep(1)
+        self.game.make_moves(moves)
+        manager.log_event(self.game_id, "move", [Game.cell_id(x, y) for x, y in moves])
+        if self.game.get_winner():
+            self.status = 2
+        self.check_bot_move()
+        await manager.send_game_state(self.game_id)
+
+    def check_delete_game(self):
         if self.to_be_deleted:
             return
-        if current_color != self.game.players[self.game.turn]:
+        if any(conn.connected for conn in self.connections):
+            timer_wheel.cancel(self.delete_timer)
+        elif self.delete_timer is None:
+            self.delete_timer = timer_wheel.schedule(self.DELETE_DELAY, self.delete_if_abandoned)
+        else:
+            timer_wheel.reschedule(self.delete_timer, self.DELETE_DELAY)
+
+    def delete_if_abandoned(self):
+        if self.to_be_deleted or any(conn.connected for conn in self.connections):
             return
+        # noinspection PyAsyncCall
+        asyncio.create_task(manager.delete_game_room(self.game_id))
+
+    def release_user_ids(self):
         for connection in self.connections:
-            if connection.color == current_color and connection.is_bot:
-                self.game.make_moves(BotMove(self.game).get_best_move())
-                if self.game.get_winner():
-                    self.status = 2
-                # noinspection PyAsyncCall
-                asyncio.create_task(self.check_bot_move())
-                await manager.send_game_state(self.game_id)
-                return
+            connection.release_user_id()
 
-    async def check_delete_game(self):
-        if self.to_be_deleted:
-            return
-        websocket_times = []
-        for conn in self.connections:
-            if conn.connected:
-                return
-            websocket_times.append(conn.websocket_last_state_change_time)
-        await asyncio.sleep(12)
-        if self.to_be_deleted:
-            return
-        for conn in self.connections:
-            if conn.connected or conn.websocket_last_state_change_time not in websocket_times:
-                return
-            websocket_times.remove(conn.websocket_last_state_change_time)
-        if len(websocket_times) > 0:
-            return
-        manager.delete_game_room(self.game_id)
+    def cancel_timers(self):
+        self.stop_pondering()
+        bot_scheduler.cancel(self)
+        timer_wheel.cancel(self.delete_timer)
+        for connection in self.connections:
+            timer_wheel.cancel(connection.bot_timer)
 
 
 class GameManager:
-    def __init__(self):
-        self.game_rooms: Dict[str, GameRoom] = {}
+    SHARD_HEARTBEAT = 1.0
 
-    def create_game_room(self):
-        generate = lambda: "".join([str(random.randint(0, 9)) for _ in range(8)])
-        game_id = generate()
-        while game_id in self.game_rooms:
-            game_id = generate()
+    def __init__(self, shard_id, shard_url):
+        self.game_rooms: Dict[str, GameRoom] = {}
+        self.room_ids = IdAllocator(self.game_rooms)
+        self.shard_id = shard_id
+        self.shard_url = shard_url
+
+    async def register_shard(self):
+        if not await registry.heartbeat(self.shard_id, self.shard_url):
+            for game_id in list(self.game_rooms):
+                await registry.claim_room(game_id, self.shard_id, self.shard_url)
+
+    async def keep_shard_registered(self):
+        while True:
+            await asyncio.sleep(self.SHARD_HEARTBEAT)
+            try:
+                await self.register_shard()
+            except ConnectionError:
+                pass
+
+    async def get_owner_url(self, data):
+        if not isinstance(data, dict):
+            return None
+        if data.get("type") == "create":
+            owner = await registry.get_least_loaded_shard(prefer=self.shard_id)
+        elif data.get("type") in ("join", "reconnect", "spectate") and type(data.get("game_id")) is str:
+            owner = await registry.get_owner(data["game_id"])
+        else:
+            return None
+        if owner is None or owner[0] == self.shard_id:
+            return None
+        return owner[1] + "?local=1"
+
+    async def create_game_room(self):
+        game_id = self.room_ids.allocate()
+        while not await registry.claim_room(game_id, self.shard_id, self.shard_url):
+            game_id = self.room_ids.allocate()
         self.game_rooms[game_id] = GameRoom(game_id)
         return game_id
 
-    def delete_game_room(self, game_id):
+    async def delete_game_room(self, game_id):
         self.game_rooms[game_id].to_be_deleted = True
+        self.game_rooms[game_id].cancel_timers()
+        self.game_rooms[game_id].release_user_ids()
+        for spectator in self.game_rooms[game_id].spectators.close():
+            spectator.spectating = None
+            await self.send_status_message(spectator, "InvalidWebSocketAction: Game does not exist")
         del self.game_rooms[game_id]
+        self.log_event(game_id, "delete")
+        await registry.release_room(game_id)
+
+    def log_event(self, game_id, kind, *args):
+        if room_log is not None:
+            room_log.append([game_id, kind, *args])
+
+    @staticmethod
+    def get_room_state(game_room: GameRoom):
+        game = None
+        if game_room.game is not None:
+            game = game_room.game.to_snapshot() | {"masks": [format(mask, "x") for mask in game_room.game.masks]}
+        return {
+            "status": game_room.status,
+            "difficulty": game_room.difficulty,
+            "connections": [[c.user_id, c.name, c.color, c.is_bot] for c in game_room.connections],
+            "game": game
+        }
+
+    def get_room_states(self):
+        return {game_id: self.get_room_state(game_room) for game_id, game_room in self.game_rooms.items()}
+
+    @staticmethod
+    def restore_connection(game_room: GameRoom, user_id, name, color=0, is_bot=False):
+        connection = PlayerConnection(None, is_bot=is_bot)
+        connection.game_id = game_room.game_id
+        connection.user_id = user_id
+        connection.name = name
+        connection.color = color
+        connection.connected = False
+        if user_id is not None:
+            PlayerConnection.by_user_id[user_id] = connection
+        game_room.connections.append(connection)
+
+    def restore_game_room(self, game_id, state):
+        game_room = self.game_rooms[game_id] = GameRoom(game_id)
+        game_room.status = state["status"]
+        game_room.difficulty = state["difficulty"]
+        for user_id, name, color, is_bot in state["connections"]:
+            self.restore_connection(game_room, user_id, name, color, is_bot)
+        if state["game"] is not None:
+            masks = [int(mask, 16) for mask in state["game"]["masks"]]
+            game_room.game = Game.from_snapshot(state["game"] | {"masks": masks})
+
+    def replay_event(self, game_id, kind, *args):
+        if kind == "create":
+            self.game_rooms[game_id] = GameRoom(game_id)
+            self.game_rooms[game_id].difficulty = args[0]
+            return
+        game_room = self.game_rooms.get(game_id)
+        if game_room is None:
+            return
+        connections = {c.user_id: c for c in game_room.connections if c.user_id is not None}
+        if kind == "join":
+            self.restore_connection(game_room, args[0], args[1])
+        elif kind == "leave":
+            game_room.connections.remove(connections[args[0]])
+            connections[args[0]].release_user_id()
+        elif kind == "color":
+            connections[args[0]].color = args[1]
+        elif kind == "add_bot":
+            game_room.add_bot(args[0])
+        elif kind == "remove_bot":
+            game_room.remove_bot(args[0])
+        elif kind == "start":
+            game_room.start_game()
+        elif kind == "move":
+            game_room.game.make_cell_moves(args[0])
+            if game_room.game.get_winner():
+                game_room.status = 2
+        elif kind == "bot":
+            connections[args[0]].is_bot = True
+        elif kind == "human":
+            connections[args[0]].is_bot = False
+        elif kind == "delete":
+            game_room.release_user_ids()
+            del self.game_rooms[game_id]
+
+    async def restore_game_rooms(self):
+        game_rooms, records = room_log.load()
+        for game_id, state in game_rooms.items():
+            self.restore_game_room(game_id, state)
+        for game_id, kind, *args in records:
+            try:
+                self.replay_event(game_id, kind, *args)
+            except (InvalidMove, InvalidWebSocketAction, KeyError, ValueError):
+                pass
+        room_log.start(self.get_room_states)
+        await room_log.compact(self.get_room_states())
+        for game_room in list(self.game_rooms.values()):
+            if game_room.status != 0:
+                for connection in list(game_room.connections):
+                    if not connection.is_bot:
+                        await game_room.disconnect_connection(connection)
+                game_room.check_bot_move()
+            game_room.check_delete_game()
 
     async def send_status_message(self, connection: PlayerConnection, message: str):
-        await connection.websocket.send_json({"type": "status", "status": message})
-
-    async def send_game_state(self, game_id: str):
-        game_room = self.game_rooms[game_id]
+        connection.send(orjson.dumps({"type": "status", "status": message}).decode())
+
+    @staticmethod
+    def get_connection_states(game_room: GameRoom):
+        return [{"name": c.name,
+                 "color": c.color,
+                 "is_bot": c.is_bot,
+                 "connected": c.connected,
+                 "websocket_last_state_change_time": c.websocket_last_state_change_time}
+                for c in game_room.connections]
+
+    @staticmethod
+    def get_snapshot_message(game_room: GameRoom, connections, binary=False):
         if game_room.status == 0:
-            message = {
-                "id": game_id,
+            return {
+                "id": game_room.game_id,
                 "type": "game_state",
+                "seq": game_room.seq,
                 "status": game_room.status,
-                "connections": [{"name": c.name,
-                                 "color": c.color,
-                                 "is_bot": c.is_bot,
-                                 "connected": c.connected,
-                                 "websocket_last_state_change_time": c.websocket_last_state_change_time}
-                                for c in game_room.connections]
+                "difficulty": game_room.difficulty,
+                "connections": connections
             }
-        else:
-            game = game_room.game
-            message = {
-                "id": game_id,
+        game = game_room.game
+        if binary:
+            return {
+                "id": game_room.game_id,
                 "type": "game_state",
-                "board": game.board,
+                "seq": game_room.seq,
                 "players": game.players,
                 "turn": game.turn,
                 "status": game_room.status,
-                "prev_moves": game.prev_moves,
-                "connections": [{"name": c.name,
-                                 "color": c.color,
-                                 "is_bot": c.is_bot,
-                                 "connected": c.connected,
-                                 "websocket_last_state_change_time": c.websocket_last_state_change_time}
-                                for c in game_room.connections]
+                "difficulty": game_room.difficulty,
+                "connections": connections
             }
-
-        async def send_message(connection, message):
-            if connection.websocket is None:
-                return
-            await connection.websocket.send_json(
-                {**message, **{"user_id": connection.user_id, "color": connection.color}})
-
-        tasks = [
-            send_message(connection, message)
-            for connection in self.game_rooms[game_id].connections
-        ]
-        await asyncio.gather(*tasks)
+        return {
+            "id": game_room.game_id,
+            "type": "game_state",
+            "seq": game_room.seq,
+            "board": game.board,
+            "players": game.players,
+            "turn": game.turn,
+            "status": game_room.status,
+            "difficulty": game_room.difficulty,
+            "prev_moves": game.prev_moves,
+            "connections": connections
+        }
+
+    @staticmethod
+    def encode_snapshot(game_room: GameRoom, connections, binary=False):
+        message = GameManager.get_snapshot_message(game_room, connections, binary)
+        if binary:
+            return encode_game_state(message, game_room.game if game_room.status != 0 else None)
+        return orjson.dumps(message).decode()
+
+    @staticmethod
+    def get_changed_cells(game_room: GameRoom):
+        game = game_room.game
+        changed_cells = {}
+        for player in game.players:
+            changed = game.masks[player] ^ game_room.last_masks[player]
+            for cell in iter_cells(changed & game_room.last_masks[player]):
+                changed_cells.setdefault(cell, 0)
+            for cell in iter_cells(changed & game.masks[player]):
+                changed_cells[cell] = player
+        return changed_cells
+
+    @staticmethod
+    def get_delta_message(game_room: GameRoom, connections, changed_cells, binary=False):
+        game = game_room.game
+        message = {
+            "id": game_room.game_id,
+            "type": "game_delta",
+            "seq": game_room.seq,
+            "turn": game.turn,
+            "status": game_room.status,
+        }
+        if not binary:
+            message["prev_moves"] = game.prev_moves
+            message["cells"] = [[*Game.CELLS[cell], color] for cell, color in changed_cells.items()]
+        if len(connections) != len(game_room.last_connections):
+            message["connections"] = connections
+        else:
+            changes = [[i, {key: value for key, value in new.items() if old[key] != value}]
+                       for i, (old, new) in enumerate(zip(game_room.last_connections, connections)) if old != new]
+            if len(changes) > 0:
+                message["connection_changes"] = changes
+        return message
+
+    @staticmethod
+    def encode_delta(game_room: GameRoom, connections, changed_cells, binary=False):
+        message = GameManager.get_delta_message(game_room, connections, changed_cells, binary)
+        if binary:
+            return encode_game_delta(message, changed_cells, game_room.game.prev_moves)
+        return orjson.dumps(message).decode()
+
+    async def send_game_state(self, game_id: str, snapshot_connections=()):
+        game_room = self.game_rooms[game_id]
+        with GAME_STATE_ENCODE_SECONDS.time():
+            game_room.seq += 1
+            connections = self.get_connection_states(game_room)
+            send_delta = game_room.status != 0 and game_room.last_masks is not None
+            changed_cells = self.get_changed_cells(game_room) if send_delta else None
+            snapshots, deltas = {}, {}
+            for binary in {c.binary for c in game_room.connections if c.websocket is not None}:
+                snapshots[binary] = self.encode_snapshot(game_room, connections, binary)
+                deltas[binary] = self.encode_delta(game_room, connections, changed_cells, binary) \
+                    if send_delta else snapshots[binary]
+            if len(game_room.spectators) > 0:
+                spectator_frames = {
+                    binary: snapshots.get(binary) or self.encode_snapshot(game_room, connections, binary)
+                    for binary in game_room.spectators.encodings()}
+            game_room.last_connections = connections
+            game_room.last_masks = list(game_room.game.masks) if game_room.game is not None else None
+
+        with GAME_STATE_FANOUT_SECONDS.time():
+            for connection in game_room.connections:
+                if connection.websocket is None:
+                    continue
+                snapshot = snapshots[connection.binary]
+                connection.send_state(snapshot if connection in snapshot_connections else deltas[connection.binary],
+                                      snapshot)
+        if len(game_room.spectators) > 0:
+            game_room.spectators.publish(spectator_frames)
+
+    async def send_game_snapshot(self, connection: PlayerConnection):
+        game_room = self.game_rooms[connection.game_id]
+        frame = self.encode_snapshot(game_room, self.get_connection_states(game_room), connection.binary)
+        connection.send_state(frame, frame)
+
+    async def send_spectator_snapshot(self, connection: PlayerConnection):
+        game_room = self.game_rooms[connection.spectating]
+        if game_room.spectators.delay == 0:
+            frame = self.encode_snapshot(game_room, self.get_connection_states(game_room), connection.binary)
+        else:
+            frame = (game_room.spectators.latest or {}).get(connection.binary)
+        if frame is not None:
+            connection.send_state(frame, frame)
 
 
-manager = GameManager()
+manager = GameManager(os.environ.get("SHARD_ID", "local"), os.environ.get("SHARD_URL", ""))
 
 
 async def create_game_room(connection: PlayerConnection, data):
@@ -286,11 +693,17 @@ async def create_game_room(connection: PlayerConnection, data):
         raise InvalidWebSocketAction("Player is already in a game room")
     if len(data["name"]) not in range(1, 21):
         raise InvalidWebSocketAction("Player name must be between 1 and 20 characters")
-    game_id = manager.create_game_room()
+    difficulty = data.get("difficulty", "easy")
+    if type(difficulty) is not str or difficulty not in DIFFICULTIES:
+        raise InvalidWebSocketAction("Invalid difficulty selected")
+    game_id = await manager.create_game_room()
+    manager.game_rooms[game_id].difficulty = difficulty
     connection.game_id = game_id
     connection.name = data["name"]
     manager.game_rooms[game_id].add_connection(connection)
     connection.assign_random_user_id()
+    manager.log_event(game_id, "create", difficulty)
+    manager.log_event(game_id, "join", connection.user_id, connection.name)
     await manager.send_game_state(game_id)
 
 
@@ -306,7 +719,8 @@ async def join_game_room(connection: PlayerConnection, data):
     connection.name = data["name"]
     game_room.add_connection(connection)
     connection.assign_random_user_id()
-    await manager.send_game_state(game_room.game_id)
+    manager.log_event(game_room.game_id, "join", connection.user_id, connection.name)
+    await manager.send_game_state(game_room.game_id, snapshot_connections=[connection])
 
 
 async def reconnect_game_room(connection: PlayerConnection, data):
@@ -316,7 +730,28 @@ async def reconnect_game_room(connection: PlayerConnection, data):
         raise InvalidWebSocketAction("Reconnection failed")
     game_room = manager.game_rooms[data["game_id"]]
     await game_room.reconnect_connection(connection, data["user_id"])
-    await manager.send_game_state(game_room.game_id)
+    manager.log_event(game_room.game_id, "human", connection.user_id)
+    await manager.send_game_state(game_room.game_id, snapshot_connections=[connection])
+
+
+async def spectate_game_room(connection: PlayerConnection, data):
+    if connection.game_id is not None:
+        raise InvalidWebSocketAction("Player is already in a game room")
+    if data["game_id"] not in manager.game_rooms:
+        raise InvalidWebSocketAction("Game does not exist")
+    game_room = manager.game_rooms[data["game_id"]]
+    connection.spectating = game_room.game_id
+    game_room.spectators.add(connection)
+    await manager.send_spectator_snapshot(connection)
+
+
+async def sync_game_state(connection: PlayerConnection, data):
+    if connection.spectating is not None:
+        await manager.send_spectator_snapshot(connection)
+        return
+    if connection.game_id is None:
+        raise InvalidWebSocketAction("Player is not in a game room")
+    await manager.send_game_snapshot(connection)
 
 
 async def select_color(connection: PlayerConnection, data):
@@ -326,19 +761,23 @@ async def select_color(connection: PlayerConnection, data):
     if game_room.status != 0:
         raise InvalidWebSocketAction("Game is already in progress")
     game_room.select_color(connection, data["color"])
+    manager.log_event(game_room.game_id, "color", connection.user_id, connection.color)
     await manager.send_game_state(game_room.game_id)
 
 
 async def disconnect_game_room(connection: PlayerConnection):
+    if connection.spectating is not None:
+        manager.game_rooms[connection.spectating].spectators.remove(connection)
+        connection.spectating = None
     if connection.game_id is None:
         return
     game_room = manager.game_rooms[connection.game_id]
     if game_room.status == 0:
         await game_room.remove_connection(connection)
+        manager.log_event(game_room.game_id, "leave", connection.user_id)
     else:
         await game_room.disconnect_connection(connection)
-    # noinspection PyAsyncCall
-    asyncio.create_task(game_room.check_delete_game())
+    game_room.check_delete_game()
     await manager.send_game_state(game_room.game_id)
 
 
@@ -349,6 +788,7 @@ async def add_bot(connection: PlayerConnection, data):
     if game_room.status != 0:
         raise InvalidWebSocketAction("Game is already in progress")
     game_room.add_bot(data["color"])
+    manager.log_event(game_room.game_id, "add_bot", data["color"])
     await manager.send_game_state(game_room.game_id)
 
 
@@ -359,6 +799,7 @@ async def remove_bot(connection: PlayerConnection, data):
     if game_room.status != 0:
         raise InvalidWebSocketAction("Game is already in progress")
     game_room.remove_bot(data["color"])
+    manager.log_event(game_room.game_id, "remove_bot", data["color"])
     await manager.send_game_state(game_room.game_id)
 
 
@@ -369,8 +810,8 @@ async def start_game(connection: PlayerConnection, data):
     if game_room.status != 0:
         raise InvalidWebSocketAction("Game is already in progress")
     game_room.start_game()
-    # noinspection PyAsyncCall
-    asyncio.create_task(game_room.check_bot_move())
+    manager.log_event(game_room.game_id, "start")
+    game_room.check_bot_move()
     await manager.send_game_state(game_room.game_id)
 
 
@@ -385,45 +826,92 @@ async def make_move(connection: PlayerConnection, data):
         raise InvalidWebSocketAction("A player has already won the game")
     if game.players[game.turn] != connection.color:
         raise InvalidWebSocketAction("It is not your turn")
-    moves = data["moves"]
-    if not isinstance(moves, list):
-        raise InvalidWebSocketAction("The moves should be a list.")
-    if not all(isinstance(move, list) and len(move) == 2 for move in moves):
-        raise InvalidWebSocketAction("Each move should be a list of two elements.")
-    game.make_moves(moves)
+    if "cells" in data:
+        cells = data["cells"]
+        if not isinstance(cells, list) or not all(type(cell) is int for cell in cells):
+            raise InvalidWebSocketAction("The cells should be a list of cell ids.")
+        game.make_cell_moves(cells)
+    else:
+        moves = data["moves"]
+        if not isinstance(moves, list):
+            raise InvalidWebSocketAction("The moves should be a list.")
+        if not all(isinstance(move, list) and len(move) == 2 for move in moves):
+            raise InvalidWebSocketAction("Each move should be a list of two elements.")
+        game.make_moves(moves)
+        cells = [Game.cell_id(x, y) for x, y in moves]
+    game_room.stop_pondering()
+    manager.log_event(game_room.game_id, "move", cells)
     if game.get_winner():
         game_room.status = 2
-    # noinspection PyAsyncCall
-    asyncio.create_task(game_room.check_bot_move())
+    game_room.check_bot_move()
     await manager.send_game_state(game_room.game_id)
 
 
+MESSAGE_TYPES = ("create", "join", "reconnect", "spectate", "select_color", "add_bot", "remove_bot", "start", "move",
+                 "sync")
+
+
+def get_message_type(data):
+    if isinstance(data, dict) and data.get("type") in MESSAGE_TYPES:
+        return data["type"]
+    return "unknown"
+
+
+async def receive_message(connection: PlayerConnection):
+    if not connection.binary:
+        return await connection.websocket.receive_json()
+    message = await connection.websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message["code"])
+    if message.get("bytes") is not None:
+        return decode_client_frame(message["bytes"])
+    return json.loads(message["text"])
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    connection = PlayerConnection(websocket)
+    binary = BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
+    connection = PlayerConnection(websocket, binary=binary)
+    local = websocket.query_params.get("local") == "1"
     while websocket.application_state == WebSocketState.CONNECTED:
         try:
-            data = await websocket.receive_json()
-            if data["type"] == "create":
-                await create_game_room(connection, data)
-            elif data["type"] == "join":
-                await join_game_room(connection, data)
-            elif data["type"] == "reconnect":
-                await reconnect_game_room(connection, data)
-            elif data["type"] == "select_color":
-                await select_color(connection, data)
-            elif data["type"] == "add_bot":
-                await add_bot(connection, data)
-            elif data["type"] == "remove_bot":
-                await remove_bot(connection, data)
-            elif data["type"] == "start":
-                await start_game(connection, data)
-            elif data["type"] == "move":
-                await make_move(connection, data)
-            else:
-                raise KeyError()
-            await manager.send_status_message(connection, "Success")
+            data = await receive_message(connection)
+            owner_url = None if local or connection.game_id is not None else await manager.get_owner_url(data)
+            if owner_url is not None:
+                try:
+                    await proxy_websocket(websocket, owner_url, orjson.dumps(data).decode(),
+                                          BINARY_SUBPROTOCOL if binary else None)
+                except (OSError, WebSocketException):
+                    pass
+                await connection.close_connection()
+                return
+            with WEBSOCKET_MESSAGE_SECONDS.labels(get_message_type(data)).time():
+                if connection.spectating is not None and data["type"] != "sync":
+                    raise InvalidWebSocketAction("Spectators can only sync")
+                if data["type"] == "create":
+                    await create_game_room(connection, data)
+                elif data["type"] == "join":
+                    await join_game_room(connection, data)
+                elif data["type"] == "reconnect":
+                    await reconnect_game_room(connection, data)
+                elif data["type"] == "spectate":
+                    await spectate_game_room(connection, data)
+                elif data["type"] == "select_color":
+                    await select_color(connection, data)
+                elif data["type"] == "add_bot":
+                    await add_bot(connection, data)
+                elif data["type"] == "remove_bot":
+                    await remove_bot(connection, data)
+                elif data["type"] == "start":
+                    await start_game(connection, data)
+                elif data["type"] == "move":
+                    await make_move(connection, data)
+                elif data["type"] == "sync":
+                    await sync_game_state(connection, data)
+                else:
+                    raise KeyError()
+                await manager.send_status_message(connection, "Success")
         except json.JSONDecodeError as e:
             await manager.send_status_message(connection, "JSONDecodeError: " + str(e))
         except KeyError as e:
@@ -435,10 +923,36 @@ async def websocket_endpoint(websocket: WebSocket):
         except WebSocketDisconnect as e:
             break
     await disconnect_game_room(connection)
+    connection.stop_writer()
 
 
 @app.get("/stats")
 async def stats():
-    return {"games_running": len(manager.game_rooms)}
+    return {"games_running": len(manager.game_rooms), "pending_timers": len(timer_wheel)}
+
+
+@app.get("/metrics")
+async def metrics():
+    rooms = {0: 0, 1: 0, 2: 0}
+    connected_players = bots = queued_frames = spectators = 0
+    for game_room in manager.game_rooms.values():
+        rooms[game_room.status] += 1
+        spectators += len(game_room.spectators)
+        queued_frames += sum(len(spectator.outbound) for spectator in game_room.spectators.spectators)
+        for connection in game_room.connections:
+            connected_players += connection.websocket is not None
+            bots += connection.is_bot
+            queued_frames += len(connection.outbound)
+    for status, count in rooms.items():
+        GAME_ROOMS.set(count, status)
+    CONNECTED_PLAYERS.set(connected_players)
+    BOTS.set(bots)
+    PENDING_TASKS.set(len(asyncio.all_tasks()))
+    PENDING_TIMERS.set(len(timer_wheel))
+    BOT_QUEUE_DEPTH.set(bot_scheduler.queue_depth())
+    BOT_MOVES_RUNNING.set(len(bot_scheduler.active))
+    OUTBOUND_QUEUED_FRAMES.set(queued_frames)
+    SPECTATORS.set(spectators)
+    return PlainTextResponse(generate_latest(), media_type="text/plain; version=0.0.4")
 
 app.mount("/", StaticFiles(directory="web/dist", html=True))
\ No newline at end of file
@@ -0,0 +1,102 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import Game, BotMove, ScoreEvaluator, BatchScoreEvaluator  # noqa: E402
+
+
+def generate_positions(seed, count):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = Game(rng.sample(range(1, 7), rng.choice([2, 3, 4, 6])))
+        for _ in range(rng.randint(0, 120)):
+            if game.get_winner():
+                break
+            game.make_moves(rng.choice(BotMove(game).get_all_possible_moves()))
+        if not game.get_winner():
+            positions.append(game)
+    return positions
+
+
+def candidates(game):
+    return BotMove(game).get_all_possible_endpoints()
+
+
+def time_scalar(game):
+    bot = BotMove(game)
+    player = game.current_player()
+    scores = []
+    start = time.perf_counter()
+    for origin, destination in candidates(game):
+        bot.game.move_piece(player, origin, destination)
+        scores.append(bot.calculate_score())
+        bot.game.move_piece(player, destination, origin)
+    return time.perf_counter() - start, scores
+
+
+def time_incremental(game):
+    scores = []
+    start = time.perf_counter()
+    evaluator = ScoreEvaluator(game, game.current_player())
+    for origin, destination in candidates(game):
+        scores.append(evaluator.score_move(origin, destination))
+    return time.perf_counter() - start, scores
+
+
+def time_batch(game):
+    start = time.perf_counter()
+    scores = BatchScoreEvaluator(game, game.current_player()).score_moves(candidates(game))
+    return time.perf_counter() - start, scores
+
+
+def find_batch_threshold(positions, sizes, repeat):
+    incremental_time = dict.fromkeys(sizes, 0)
+    batch_time = dict.fromkeys(sizes, 0)
+    for game in positions:
+        player = game.current_player()
+        endpoints = candidates(game)
+        for size in sizes:
+            subset = (endpoints * (size // len(endpoints) + 1))[:size]
+            for _ in range(repeat):
+                start = time.perf_counter()
+                evaluator = ScoreEvaluator(game, player)
+                for origin, destination in subset:
+                    evaluator.score_move(origin, destination)
+                incremental_time[size] += time.perf_counter() - start
+                start = time.perf_counter()
+                BatchScoreEvaluator(game, player).score_moves(subset)
+                batch_time[size] += time.perf_counter() - start
+    for size in sizes:
+        print(f"{size:4d} candidates: incremental {incremental_time[size] / len(positions) / repeat * 1e3:6.2f} ms, "
+              f"batch {batch_time[size] / len(positions) / repeat * 1e3:6.2f} ms")
+    return next((size for size in sizes if batch_time[size] < incremental_time[size]), None)
+
+
+def main():
+    positions = generate_positions(seed=0, count=50)
+    scalar_time = incremental_time = batch_time = 0
+    num_candidates = 0
+    for game in positions:
+        elapsed, scalar_scores = time_scalar(game)
+        scalar_time += elapsed
+        elapsed, incremental_scores = time_incremental(game)
+        incremental_time += elapsed
+        elapsed, batch_scores = time_batch(game)
+        batch_time += elapsed
+        assert scalar_scores == incremental_scores == batch_scores
+        num_candidates += len(scalar_scores)
+    print(f"positions: {len(positions)}, candidates: {num_candidates}")
+    print(f"calculate_score:                  {scalar_time / num_candidates * 1e6:8.1f} us/candidate")
+    print(f"ScoreEvaluator.score_move:        {incremental_time / num_candidates * 1e6:8.1f} us/candidate")
+    print(f"BatchScoreEvaluator.score_moves:  {batch_time / num_candidates * 1e6:8.1f} us/candidate")
+    print(f"incremental speedup: {scalar_time / incremental_time:.2f}x, batch speedup: {scalar_time / batch_time:.2f}x")
+    threshold = find_batch_threshold(positions[:20], sizes=range(10, 130, 10), repeat=3)
+    print(f"batch is faster from {threshold} candidates, BotMove.BATCH_THRESHOLD is {BotMove.BATCH_THRESHOLD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+
+import orjson
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from game import Game, BotMove  # noqa: E402
+
+COLORS = {
+    1: [1],
+    2: [1, 4],
+    3: [1, 3, 5],
+    4: [2, 3, 5, 6],
+    5: [1, 2, 3, 4, 5],
+    6: [1, 2, 3, 4, 5, 6],
+}
+REQUEST_TIMEOUT = 10
+
+
+class LoadError(Exception):
+    pass
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.moves = 0
+        self.messages = 0
+        self.errors = 0
+        self.games = 0
+
+    def summary(self, seconds):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if len(latencies) == 0:
+                return None
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        return {
+            "moves_per_sec": self.moves / seconds,
+            "messages_per_sec": self.messages / seconds,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": latencies[-1] * 1000 if latencies else None,
+            "errors": self.errors,
+            "games": self.games,
+        }
+
+
+class LoadClient:
+    def __init__(self, url, load_test):
+        self.url = url
+        self.load_test = load_test
+        self.websocket = None
+        self.reader = None
+        self.statuses = asyncio.Queue()
+        self.changed = asyncio.Event()
+        self.game_id = None
+        self.user_id = None
+        self.color = 0
+        self.players = []
+        self.turn = 0
+        self.status = 0
+        self.masks = [0] * 7
+        self.prev_moves = []
+        self.pending_move = None
+        self.sent_at = None
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.url, max_size=None, open_timeout=REQUEST_TIMEOUT)
+        self.reader = asyncio.create_task(self.read())
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+        if self.reader is not None:
+            self.reader.cancel()
+
+    async def request(self, message):
+        await self.websocket.send(orjson.dumps(message).decode())
+        try:
+            status = await asyncio.wait_for(self.statuses.get(), REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise LoadError(f"No reply to {message['type']}")
+        if status != "Success":
+            raise LoadError(status)
+
+    async def read(self):
+        try:
+            async for text in self.websocket:
+                self.load_test.stats.messages += 1
+                self.handle(orjson.loads(text))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.changed.set()
+
+    def handle(self, message):
+        if message["type"] == "status":
+            self.statuses.put_nowait(message["status"])
+        elif message["type"] == "identity":
+            self.user_id = message["user_id"]
+            self.color = message["color"]
+        elif message["type"] in ("game_state", "game_delta"):
+            self.game_id = message["id"]
+            self.status = message["status"]
+            if message["type"] == "game_state" and "board" in message:
+                self.players = message["players"]
+                self.masks = [0] * 7
+                for cell, (x, y) in enumerate(Game.CELLS):
+                    self.masks[message["board"][x][y]] |= 1 << cell
+            for x, y, player in message.get("cells", ()):
+                cell = Game.cell_id(x, y)
+                for i in range(7):
+                    self.masks[i] &= ~(1 << cell)
+                self.masks[player] |= 1 << cell
+            self.turn = message.get("turn", self.turn)
+            self.prev_moves = message.get("prev_moves", self.prev_moves)
+            if self.pending_move is not None and self.prev_moves == self.pending_move:
+                self.load_test.stats.latencies.append(time.perf_counter() - self.sent_at)
+                self.pending_move = None
+            self.changed.set()
+
+    def my_turn(self):
+        return self.status == 1 and len(self.players) > 0 and self.players[self.turn] == self.color
+
+    async def play(self):
+        while self.status != 2 and not self.load_test.stopping:
+            if not self.my_turn() or self.pending_move is not None:
+                self.changed.clear()
+                await asyncio.wait_for(self.changed.wait(), REQUEST_TIMEOUT * 6)
+                if self.websocket.close_code is not None:
+                    raise LoadError("Connection closed by the server")
+                continue
+            await asyncio.sleep(random.expovariate(1 / self.load_test.think) if self.load_test.think > 0 else 0)
+            game = Game.from_snapshot({"players": self.players, "turn": self.turn, "masks": self.masks,
+                                       "prev_moves": self.prev_moves})
+            moves = [list(move) for move in BotMove(game).get_best_move()]
+            self.pending_move = moves
+            self.sent_at = time.perf_counter()
+            await self.request({"type": "move", "moves": moves})
+            self.load_test.stats.moves += 1
+            if random.random() < self.load_test.reconnect_rate:
+                await self.reconnect()
+
+    async def reconnect(self):
+        await self.close()
+        await asyncio.sleep(random.uniform(0.1, 1.0))
+        self.pending_move = None
+        await self.connect()
+        await self.request({"type": "reconnect", "game_id": self.game_id, "user_id": self.user_id})
+
+
+class LoadTest:
+    def __init__(self, url, mix, think, reconnect_rate, difficulty):
+        self.url = url
+        self.mix = mix
+        self.think = think
+        self.reconnect_rate = reconnect_rate
+        self.difficulty = difficulty
+        self.stats = Stats()
+        self.stopping = False
+        self.rooms = []
+
+    async def run_room(self):
+        while not self.stopping:
+            humans, bots = random.choice(self.mix)
+            clients = [LoadClient(self.url, self) for _ in range(humans)]
+            try:
+                for client in clients:
+                    await client.connect()
+                host = clients[0]
+                await host.request({"type": "create", "name": "load", "difficulty": self.difficulty})
+                for client in clients[1:]:
+                    await client.request({"type": "join", "game_id": host.game_id, "name": "load"})
+                colors = COLORS[humans + bots]
+                for client, color in zip(clients, colors):
+                    await client.request({"type": "select_color", "color": color})
+                for color in colors[humans:]:
+                    await host.request({"type": "add_bot", "color": color})
+                await host.request({"type": "start"})
+                await asyncio.gather(*(client.play() for client in clients))
+                self.stats.games += 1
+            except (LoadError, OSError, asyncio.TimeoutError, websockets.WebSocketException):
+                self.stats.errors += 1
+                await asyncio.sleep(1)
+            finally:
+                await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+
+    def add_rooms(self, count):
+        for _ in range(count):
+            self.rooms.append(asyncio.create_task(self.run_room()))
+
+    async def stop(self):
+        self.stopping = True
+        for room in self.rooms:
+            room.cancel()
+        await asyncio.gather(*self.rooms, return_exceptions=True)
+
+
+def process_tree_cpu(pid):
+    parents, times = {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        parents[int(entry)] = int(fields[1])
+        times[int(entry)] = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    tree = {pid}
+    while True:
+        children = {child for child, parent in parents.items() if parent in tree} - tree
+        if len(children) == 0:
+            break
+        tree |= children
+    return times.get(pid, 0.0), sum(times.get(process, 0.0) for process in tree)
+
+
+def start_server(port):
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+                               "--log-level", "warning"], cwd=ROOT)
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1)
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def raise_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def ramp(args, server):
+    load_test = LoadTest(args.url or f"ws://127.0.0.1:{args.port}/ws", args.mix, args.think, args.reconnect_rate,
+                         args.difficulty)
+    results = []
+    rooms = args.start_rooms
+    print(f"{'rooms':>6} {'moves/s':>8} {'msgs/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'loop cpu':>8} {'all cpu':>8} {'load cpu':>8} {'errors':>6}")
+    try:
+        while rooms <= args.max_rooms:
+            load_test.add_rooms(rooms - len(load_test.rooms))
+            await asyncio.sleep(args.warmup)
+            load_test.stats = Stats()
+            cpu_before = process_tree_cpu(server.pid) if server is not None else (0.0, 0.0)
+            start, client_cpu = time.perf_counter(), time.process_time()
+            await asyncio.sleep(args.stage_seconds)
+            elapsed = time.perf_counter() - start
+            client_cpu = (time.process_time() - client_cpu) / elapsed
+            cpu_after = process_tree_cpu(server.pid) if server is not None else (0.0, 0.0)
+            result = {"rooms": rooms, **load_test.stats.summary(elapsed),
+                      "server_loop_cpu": (cpu_after[0] - cpu_before[0]) / elapsed,
+                      "server_total_cpu": (cpu_after[1] - cpu_before[1]) / elapsed,
+                      "load_generator_cpu": client_cpu}
+            results.append(result)
+            print(f"{rooms:6} {result['moves_per_sec']:8.1f} {result['messages_per_sec']:8.1f} "
+                  f"{result['p50_ms'] or 0:8.1f} {result['p95_ms'] or 0:8.1f} {result['p99_ms'] or 0:8.1f} "
+                  f"{result['server_loop_cpu']:8.0%} {result['server_total_cpu']:8.0%} {client_cpu:8.0%} "
+                  f"{result['errors']:6}")
+            if client_cpu > 0.9 or client_cpu + result["server_total_cpu"] > 0.9 * os.cpu_count():
+                print("The load generator is short of CPU, so latencies include its own delays. Run it on another "
+                      "machine with --url for exact numbers.")
+            if (result["p99_ms"] is None or result["p99_ms"] > args.max_p99 or
+                    result["errors"] > args.max_error_rate * max(1, result["moves_per_sec"] * elapsed)):
+                break
+            rooms = int(rooms * args.growth)
+    finally:
+        await load_test.stop()
+    healthy = [result for result in results if result["p99_ms"] is not None and result["p99_ms"] <= args.max_p99]
+    if len(healthy) == len(results):
+        print(f"Not saturated at {results[-1]['rooms']} rooms")
+    elif len(healthy) > 0:
+        print(f"Saturated between {healthy[-1]['rooms']} and {results[-1]['rooms']} rooms")
+    else:
+        print(f"Saturated at {results[0]['rooms']} rooms or fewer")
+    return results
+
+
+def parse_mix(mix):
+    entries = []
+    for entry in mix.split(","):
+        humans, bots = (int(value) for value in entry.split("+"))
+        if humans < 1 or humans + bots not in COLORS:
+            raise argparse.ArgumentTypeError(f"Invalid player mix {entry}")
+        entries.append((humans, bots))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive simulated rooms through /ws and find how many rooms the server "
+                                                 "handles before move latency falls apart.")
+    parser.add_argument("--url", help="WebSocket URL of a running server (starts one locally if omitted)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("1+1,2+0,1+3,2+4"),
+                        help="comma separated HUMANS+BOTS room configurations picked at random")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time of simulated players in seconds")
+    parser.add_argument("--reconnect-rate", type=float, default=0.02, help="chance to reconnect after each move")
+    parser.add_argument("--difficulty", default="easy", choices=["easy", "medium", "hard"])
+    parser.add_argument("--start-rooms", type=int, default=25)
+    parser.add_argument("--growth", type=float, default=2.0, help="room count multiplier between stages")
+    parser.add_argument("--max-rooms", type=int, default=6400)
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds before measuring each stage")
+    parser.add_argument("--stage-seconds", type=float, default=20.0)
+    parser.add_argument("--max-p99", type=float, default=250.0, help="p99 move latency in ms that counts as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="errors per move that count as saturated")
+    parser.add_argument("--output", help="write the stage results as JSON")
+    args = parser.parse_args()
+
+    raise_file_limit()
+    server = start_server(args.port) if args.url is None else None
+    try:
+        results = asyncio.run(ramp(args, server))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import Game, BotMove  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+PLAYER_CONFIGURATIONS = {
+    2: [1, 4],
+    3: [1, 3, 5],
+    4: [2, 3, 5, 6],
+    6: [1, 2, 3, 4, 5, 6],
+}
+
+
+def generate_corpus(seed, positions_per_configuration):
+    corpus = {}
+    for num_players, players in PLAYER_CONFIGURATIONS.items():
+        random.seed(seed * 100 + num_players)
+        corpus[num_players] = []
+        while len(corpus[num_players]) < positions_per_configuration:
+            game = Game(players)
+            for _ in range(random.randint(0, 40 * num_players)):
+                if game.get_winner():
+                    break
+                bot = BotMove(game)
+                game.make_moves(bot.get_best_move() if random.random() < 0.8 else
+                                random.choice(bot.get_all_possible_moves()))
+            if not game.get_winner():
+                corpus[num_players].append(game)
+    return corpus
+
+
+def measure(operation, inputs, repeat, setup=None):
+    latencies = []
+    for _ in range(repeat):
+        for value in inputs:
+            if setup is not None:
+                value = setup(value)
+            start = time.perf_counter()
+            operation(value)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / sum(latencies),
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+    }
+
+
+def bench_make_moves(games):
+    cases = []
+    for game in games:
+        move = BotMove(game).get_all_possible_moves()[0]
+        cases.append((game.to_snapshot(), [list(location) for location in move]))
+
+    return measure(lambda case: case[0].make_moves(case[1]), cases, repeat=200,
+                   setup=lambda case: (Game.from_snapshot(case[0]), case[1]))
+
+
+def bench_get_all_possible_moves(games):
+    return measure(lambda bot: bot.get_all_possible_moves(), [BotMove(game) for game in games], repeat=50)
+
+
+def bench_calculate_score(games):
+    return measure(lambda bot: bot.calculate_score(), [BotMove(game) for game in games], repeat=50)
+
+
+def bench_get_best_move(games):
+    def get_best_move(game):
+        BotMove.CACHE.clear()
+        BotMove(game).get_best_move()
+
+    return measure(get_best_move, games, repeat=2)
+
+
+def calibrate():
+    def workload(_):
+        total = 0
+        for i in range(20000):
+            total += i * i % 7
+        return total
+
+    return measure(workload, [None], repeat=50)["p50_us"]
+
+
+BENCHMARKS = {
+    "make_moves": bench_make_moves,
+    "get_all_possible_moves": bench_get_all_possible_moves,
+    "calculate_score": bench_calculate_score,
+    "get_best_move": bench_get_best_move,
+}
+
+
+def run(seed, positions, selected):
+    corpus = generate_corpus(seed, positions)
+    results = {}
+    for name in selected:
+        for num_players, games in corpus.items():
+            random.seed(seed)
+            before = calibrate()
+            result = BENCHMARKS[name](games)
+            result["calibration_us"] = min(before, calibrate())
+            results[f"{name}/{num_players}p"] = result
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        # the calibration loop tracks how fast this machine was during the benchmark, so only relative slowdowns count
+        speed = baseline[key]["calibration_us"] / result["calibration_us"]
+        ratio = result["p50_us"] * speed / max(baseline[key]["p50_us"], 1e-9)
+        status = "REGRESSION" if ratio > 1 + threshold else "ok"
+        print(f"{key:32} p50 {baseline[key]['p50_us']:10.1f} -> {result['p50_us']:10.1f} us "
+              f"({ratio:5.2f}x normalized) {status}")
+        if status != "ok":
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game engine and the bot.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--positions", type=int, default=10, help="positions per player count")
+    parser.add_argument("--only", nargs="*", choices=BENCHMARKS.keys(), default=list(BENCHMARKS.keys()))
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with these results")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown before failing")
+    args = parser.parse_args()
+
+    results = run(args.seed, args.positions, args.only)
+    for key, result in results.items():
+        print(f"{key:32} {result['ops_per_sec']:12.1f} ops/s  p50 {result['p50_us']:10.1f} us  "
+              f"p99 {result['p99_us']:10.1f} us")
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "positions": args.positions,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline["seed"], baseline["positions"]) != (args.seed, args.positions):
+            print("Baseline was recorded with a different corpus, skipping comparison")
+            return
+        if compare(results, baseline["results"], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
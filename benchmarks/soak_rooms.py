@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import PlayerConnection, manager  # noqa: E402
+
+
+async def cycle(rooms_alive, players):
+    game_id = await manager.create_game_room()
+    game_room = manager.game_rooms[game_id]
+    for _ in range(players):
+        connection = PlayerConnection(None)
+        connection.game_id = game_id
+        game_room.add_connection(connection)
+        connection.assign_random_user_id()
+    user_id = game_room.connections[0].user_id
+    await game_room.reconnect_connection(PlayerConnection(None), user_id)
+    rooms_alive.append(game_id)
+    if len(rooms_alive) > 100:
+        await manager.delete_game_room(rooms_alive.pop(0))
+
+
+def footprint():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def soak(cycles, players, checkpoints, tolerance):
+    await manager.register_shard()
+    rooms_alive = []
+    tracemalloc.start()
+    for _ in range(1000):
+        await cycle(rooms_alive, players)
+    baseline = footprint()
+    worst = 0
+    for checkpoint in range(1, checkpoints + 1):
+        for _ in range(cycles // checkpoints):
+            await cycle(rooms_alive, players)
+        growth = footprint() - baseline
+        worst = max(worst, growth)
+        print(f"{checkpoint * cycles // checkpoints:10} cycles  rooms {len(manager.game_rooms):4}  "
+              f"user ids {len(PlayerConnection.by_user_id):5}  heap growth {growth / 1024:8.1f} KiB")
+    assert len(manager.game_rooms) <= 101 and len(PlayerConnection.by_user_id) <= 101 * players
+    if worst > tolerance:
+        print(f"Memory grew by {worst / 1024:.1f} KiB, more than the allowed {tolerance / 1024:.1f} KiB")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create and delete rooms in a loop and check memory stays flat.")
+    parser.add_argument("--cycles", type=int, default=1000000)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--checkpoints", type=int, default=10)
+    parser.add_argument("--tolerance", type=int, default=256 * 1024, help="allowed heap growth in bytes")
+    args = parser.parse_args()
+    asyncio.run(soak(args.cycles, args.players, args.checkpoints, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from endgame import EndgameSolver
+from game import Game, BotMove, ScoreEvaluator
+from opening_book import OpeningBook
+from search import BotSearch
+
+BOOK = None
+
+
+def configure_worker(cache_size):
+    global BOOK
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    BotMove.CACHE.resize(cache_size)
+    BOOK = OpeningBook.load()
+
+
+def compute_best_move(snapshot, time_budget=None, node_budget=None):
+    game = Game.from_snapshot(snapshot)
+    move = EndgameSolver(game).get_best_move()
+    if move is not None:
+        return move
+    if time_budget is None:
+        return BotMove(game).get_best_move()
+    move = BOOK.get_move(game) if BOOK is not None else None
+    if move is not None:
+        return move
+    return BotSearch(game, time_budget, node_budget).get_best_move()
+
+
+def rank_likely_moves(snapshot, count):
+    game = Game.from_snapshot(snapshot)
+    bot = BotMove(game)
+    player = game.current_player()
+    endpoints = bot.get_all_possible_endpoints()
+    scores = bot.score_moves(player, ScoreEvaluator(game, player), endpoints)
+    best = sorted(range(len(endpoints)), key=lambda i: scores[i])[:count]
+    return [bot.get_path(*endpoints[i]) for i in best]
+
+
+class BotEngine:
+    def __init__(self, workers=None, timeout=5.0, cache_size=1 << 16, max_think_time=None, max_nodes=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.max_think_time = max_think_time
+        self.max_nodes = max_nodes
+        self.executor = None
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=configure_worker,
+                                                initargs=(self.cache_size,))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def cap_time_budget(self, time_budget):
+        if time_budget is not None and self.max_think_time is not None:
+            return min(time_budget, self.max_think_time)
+        return time_budget
+
+    async def get_best_move(self, game: Game, time_budget=None):
+        self.start()
+        snapshot = game.to_snapshot()
+        time_budget = self.cap_time_budget(time_budget)
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self.executor, compute_best_move, snapshot, time_budget, self.max_nodes)
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            return BotMove(game).get_fallback_move()
+        except BrokenProcessPool:
+            self.executor = None
+            return BotMove(game).get_fallback_move()
+        except Exception as e:
+            loop.call_exception_handler({"message": "Bot worker failed", "exception": e})
+            return BotMove(game).get_fallback_move()
+
+    async def run_ponder_job(self, slots, function, *args):
+        if self.executor is None or not slots.acquire_ponder_slot():
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.executor.submit(function, *args)
+        except BaseException:
+            slots.release_ponder_slot()
+            raise
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(slots.release_ponder_slot))
+        return await asyncio.wrap_future(future)
+
+    async def ponder(self, game: Game, time_budget, count, replies, slots):
+        self.start()
+        snapshot = game.to_snapshot()
+        time_budget = self.cap_time_budget(time_budget)
+        try:
+            candidates = await self.run_ponder_job(slots, rank_likely_moves, snapshot, count)
+            for moves in candidates or []:
+                after = Game.from_snapshot(snapshot)
+                after.make_moves(moves)
+                if after.get_winner():
+                    continue
+                reply = await self.run_ponder_job(slots, compute_best_move, after.to_snapshot(), time_budget,
+                                                  self.max_nodes)
+                if reply is None:
+                    return
+                replies[(after.hash, after.turn)] = reply
+        except BrokenProcessPool:
+            self.executor = None
@@ -0,0 +1,97 @@
+import asyncio
+from collections import deque
+
+
+class BotScheduler:
+    def __init__(self, timer_wheel, max_concurrent=1, pacing_delay=1.0, max_queue=64):
+        self.timer_wheel = timer_wheel
+        self.max_concurrent = max_concurrent
+        self.pacing_delay = pacing_delay
+        self.max_queue = max_queue
+        self.human_queue = deque()
+        self.bot_queue = deque()
+        self.queued = set()
+        self.pending = {}
+        self.active = set()
+        self.pondering = 0
+        self.rerun = set()
+        self.tasks = set()
+
+    def stop(self):
+        for room in list(self.pending):
+            self.cancel(room)
+        self.human_queue.clear()
+        self.bot_queue.clear()
+        self.queued.clear()
+        for task in list(self.tasks):
+            task.cancel()
+
+    def running(self):
+        return len(self.active) + self.pondering
+
+    def idle(self):
+        return len(self.queued) == 0 and self.running() < self.max_concurrent
+
+    def can_ponder(self, room=None):
+        running = self.running() - (room in self.active)
+        return len(self.queued) == 0 and running < self.max_concurrent - 1
+
+    def acquire_ponder_slot(self):
+        if not self.can_ponder():
+            return False
+        self.pondering += 1
+        return True
+
+    def release_ponder_slot(self):
+        self.pondering -= 1
+        self.dispatch()
+
+    def queue_depth(self):
+        return len(self.queued)
+
+    def request(self, room):
+        if room in self.active:
+            self.rerun.add(room)
+        elif room not in self.queued and room not in self.pending:
+            self.pending[room] = self.timer_wheel.schedule(self.pacing_delay, self.enqueue, room)
+
+    def cancel(self, room):
+        self.timer_wheel.cancel(self.pending.pop(room, None))
+        self.queued.discard(room)
+        self.rerun.discard(room)
+
+    def enqueue(self, room):
+        self.pending.pop(room, None)
+        if not room.needs_bot_move():
+            return
+        humans = room.has_connected_humans()
+        if not humans and self.queue_depth() >= self.max_queue:
+            self.pending[room] = self.timer_wheel.schedule(self.pacing_delay, self.enqueue, room)
+            return
+        (self.human_queue if humans else self.bot_queue).append(room)
+        self.queued.add(room)
+        self.dispatch()
+
+    def dispatch(self):
+        while self.running() < self.max_concurrent and (self.human_queue or self.bot_queue):
+            room = (self.human_queue or self.bot_queue).popleft()
+            if room not in self.queued:
+                continue
+            self.queued.discard(room)
+            degraded = self.queue_depth() >= self.max_queue
+            self.active.add(room)
+            task = asyncio.create_task(self.run(room, degraded))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run(self, room, degraded):
+        try:
+            await room.play_bot_move(degraded)
+        except Exception as e:
+            asyncio.get_running_loop().call_exception_handler({"message": "Bot move failed", "exception": e})
+        finally:
+            self.active.discard(room)
+            if room in self.rerun:
+                self.rerun.discard(room)
+                self.request(room)
+            self.dispatch()
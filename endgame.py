@@ -0,0 +1,103 @@
+import os
+
+from game import Game, BotMove, EvaluationCache, iter_cells
+
+ENDGAME_DISTANCE = int(os.environ.get("ENDGAME_DISTANCE", 3))
+ENDGAME_PIECES = int(os.environ.get("ENDGAME_PIECES", 4))
+ENDGAME_NODE_BUDGET = int(os.environ.get("ENDGAME_NODE_BUDGET", 200000))
+ENDGAME_TABLE_SIZE = int(os.environ.get("ENDGAME_TABLE_SIZE", 1 << 16))
+UNSOLVED = 1 << 30
+
+
+class EndgameBudgetExceeded(Exception):
+    pass
+
+
+class EndgameSolver:
+    REGION_MASKS = [0] * 7
+    TABLE = EvaluationCache(ENDGAME_TABLE_SIZE)
+
+    def __init__(self, game: Game, node_budget=ENDGAME_NODE_BUDGET):
+        self.game = game
+        self.player = game.current_player()
+        self.target = Game.TARGET_MASK[self.player]
+        self.region = EndgameSolver.REGION_MASKS[self.player]
+        self.others = game.occupied & ~game.masks[self.player]
+        self.node_budget = node_budget
+        self.nodes = 0
+        self.line = []
+
+    def applies(self):
+        own = self.game.masks[self.player]
+        return (own != self.target and own & ~self.region == 0 and self.others & self.target == 0 and
+                bin(own & ~self.target).count("1") <= ENDGAME_PIECES)
+
+    def get_best_move(self):
+        if not self.applies():
+            return None
+        own = self.game.masks[self.player]
+        bound = self.lower_bound(own)
+        try:
+            while bound < UNSOLVED:
+                result = self.search(own, 0, bound)
+                if result is None:
+                    origin, destination = self.line[-1]
+                    return BotMove(self.game).get_path(origin, destination)
+                bound = result
+        except EndgameBudgetExceeded:
+            pass
+        return None
+
+    def lower_bound(self, own):
+        remembered = EndgameSolver.TABLE.get((self.player, own, self.others)) or 0
+        return max(bin(own & ~self.target).count("1"), remembered)
+
+    def search(self, own, depth, bound):
+        self.nodes += 1
+        if self.nodes > self.node_budget:
+            raise EndgameBudgetExceeded()
+        if own == self.target:
+            return None
+        estimate = depth + self.lower_bound(own)
+        if estimate > bound:
+            return estimate
+        best = UNSOLVED
+        for origin, destination in self.ordered_moves(own):
+            result = self.search(own ^ (1 << origin | 1 << destination), depth + 1, bound)
+            if result is None:
+                self.line.append((origin, destination))
+                return None
+            best = min(best, result)
+        EndgameSolver.TABLE.put((self.player, own, self.others), best - depth)
+        return best
+
+    def ordered_moves(self, own):
+        occupied = own | self.others
+        moves = []
+        for origin in iter_cells(own):
+            for destination in self.destinations(origin, occupied):
+                if self.region >> destination & 1:
+                    moves.append((origin, destination))
+        target = self.target
+        moves.sort(key=lambda move: (target >> move[0] & 1) - (target >> move[1] & 1))
+        return moves
+
+    @staticmethod
+    def destinations(origin, occupied):
+        found = {neighbor for neighbor in Game.NEIGHBORS[origin] if not occupied >> neighbor & 1}
+        visited = {origin}
+        stack = [origin]
+        while len(stack) > 0:
+            node = stack.pop()
+            for over, landing in Game.JUMPS[node]:
+                if occupied >> over & 1 and not occupied >> landing & 1 and landing not in visited:
+                    visited.add(landing)
+                    stack.append(landing)
+        visited.discard(origin)
+        return found | visited
+
+
+for player in range(1, 7):
+    EndgameSolver.REGION_MASKS[player] = sum(
+        1 << cell for cell in range(len(Game.CELLS))
+        if min(BotMove.DISTANCE[space][cell] for space in Game.HOME_CELLS[Game.OPPOSITE[player]]) <= ENDGAME_DISTANCE)
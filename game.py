@@ -1,8 +1,15 @@
+import hashlib
+import mmap
+import os
 import random
-from collections import deque
+import struct
+from bisect import insort
+from collections import deque, OrderedDict
 import copy
 from functools import wraps
 
+import numpy as np
+
 
 class InvalidMove(Exception):
     pass
@@ -106,15 +113,65 @@ class Game:
     DIR = [(-1, -1), (-1, 0), (0, -1), (0, 1), (1, 0), (1, 1)]
     OPPOSITE = {1: 4, 2: 5, 3: 6, 4: 1, 5: 2, 6: 3}
 
+    CELLS = []
+    CELL_ID = []
+    NEIGHBORS = []
+    NEIGHBOR_MASKS = []
+    JUMPS = []
+    HOME_CELLS = {}
+    HOME_MASK = {}
+    TARGET_MASK = [0] * 7
+    ZOBRIST = []
+
     def __init__(self, players):
         self.players = sorted(players)
         self.num_players = len(players)
         self.turn = 0
-        self.board = [[0] * self.BOARD_SIZE for _ in range(self.BOARD_SIZE)]
+        self.masks = [0] * 7
+        self.occupied = 0
+        self.hash = 0
+        self.in_target = [0] * 7
         self.prev_moves = []
         for player in self.players:
-            for space in self.HOME[player]:
-                self.board[space[0]][space[1]] = player
+            self.masks[player] = Game.HOME_MASK[player]
+        self.recount()
+
+    def recount(self):
+        self.occupied = 0
+        self.hash = 0
+        for player in self.players:
+            self.occupied |= self.masks[player]
+            for cell in iter_cells(self.masks[player]):
+                self.hash ^= Game.ZOBRIST[player][cell]
+            self.in_target[player] = bin(self.masks[player] & Game.TARGET_MASK[player]).count("1")
+
+    def check_consistency(self):
+        board = self.board
+        for player in self.players:
+            pieces = [(x, y) for x in range(self.BOARD_SIZE) for y in range(self.BOARD_SIZE) if board[x][y] == player]
+            assert [Game.CELLS[cell] for cell in self.pieces(player)] == pieces, f"pieces of player {player}"
+            in_target = sum(board[x][y] == player for x, y in self.HOME[self.OPPOSITE[player]])
+            assert self.in_target[player] == in_target, f"pieces of player {player} in target"
+        occupied = 0
+        position_hash = 0
+        for player in self.players:
+            occupied |= self.masks[player]
+            for cell in self.pieces(player):
+                position_hash ^= Game.ZOBRIST[player][cell]
+        assert self.occupied == occupied, "occupancy"
+        assert self.hash == position_hash, "hash"
+
+    def pieces(self, player):
+        return list(iter_cells(self.masks[player]))
+
+    @property
+    def board(self):
+        board = [[0] * self.BOARD_SIZE for _ in range(self.BOARD_SIZE)]
+        for player in self.players:
+            for cell in iter_cells(self.masks[player]):
+                x, y = Game.CELLS[cell]
+                board[x][y] = player
+        return board
 
     @staticmethod
     def valid(x, y):
@@ -122,182 +179,311 @@ class Game:
             Game.LIMITS[y][0], Game.LIMITS[y][1]
         )
 
+    @staticmethod
+    def cell_id(x, y):
+        if type(x) is not int or type(y) is not int or not Game.valid(x, y):
+            return -1
+        return Game.CELL_ID[x][y]
+
+    def empty(self, cell):
+        return not self.occupied >> cell & 1
+
     def valid_and_empty(self, x, y):
-        return Game.valid(x, y) and self.board[x][y] == 0
+        cell = Game.cell_id(x, y)
+        return cell != -1 and self.empty(cell)
 
     def valid_and_occupied_by_current_player(self, x, y):
-        return Game.valid(x, y) and self.board[x][y] == self.current_player()
+        cell = Game.cell_id(x, y)
+        return cell != -1 and self.masks[self.current_player()] >> cell & 1 == 1
 
     def make_moves(self, moves):
+        self.make_cell_moves([Game.cell_id(move[0], move[1]) for move in moves], moves)
+
+    def make_cell_moves(self, cells, moves=None):
         if self.get_winner():
             raise InvalidMove("A player has already won the game")
-        if len(moves) == 0:
-            self.prev_moves = moves
+        if len(cells) == 0:
+            self.prev_moves = []
             self.next_turn()
             return
-        if len(moves) == 1:
+        if len(cells) == 1:
             raise InvalidMove("len(moves) cannot be equal to 1")
-        if not self.valid_and_occupied_by_current_player(moves[0][0], moves[0][1]):
+        if cells[0] not in range(len(Game.CELLS)) or self.masks[self.current_player()] >> cells[0] & 1 == 0:
             raise InvalidMove("The piece is not owned by the current player")
-        if ((len(moves) == 2 and self.valid_jump_one_space(moves[0], moves[1])) or
-                all(self.valid_jump_two_spaces(moves[i], moves[i + 1]) for i in range(1, len(moves) - 1))):
-            self.board[moves[-1][0]][moves[-1][1]] = self.current_player()
-            self.board[moves[0][0]][moves[0][1]] = 0
-            self.prev_moves = moves
+        if any(cell not in range(len(Game.CELLS)) for cell in cells):
+            raise InvalidMove("Invalid move")
+        if ((len(cells) == 2 and self.valid_step(cells[0], cells[1])) or
+                all(self.valid_jump(cells[i], cells[i + 1]) for i in range(len(cells) - 1))):
+            self.move_piece(self.current_player(), cells[0], cells[-1])
+            self.prev_moves = moves if moves is not None else [list(Game.CELLS[cell]) for cell in cells]
             self.next_turn()
         else:
             raise InvalidMove("Invalid move")
 
-    def valid_jump_one_space(self, location_1, location_2):
-        displacement = (location_1[0] - location_2[0], location_1[1] - location_2[1])
-        return self.valid_and_empty(location_2[0], location_2[1]) and displacement in Game.DIR
-
-    def valid_jump_two_spaces(self, location_1, location_2):
-        displacement = (location_2[0] - location_1[0], location_2[1] - location_1[1])
-        if displacement[0] % 2 == 1 or displacement[1] % 2 == 1:
-            return False
-        displacement = (
-            displacement[0] // 2,
-            displacement[1] // 2,
-        )
-        return self.valid_and_empty(location_2[0], location_2[1]) and displacement in self.DIR and \
-            self.board[location_1[0] + displacement[0]][location_1[1] + displacement[1]] != 0
+    def move_piece(self, player, origin, destination):
+        change = 1 << origin | 1 << destination
+        self.masks[player] ^= change
+        self.occupied ^= change
+        self.hash ^= Game.ZOBRIST[player][origin] ^ Game.ZOBRIST[player][destination]
+        target = Game.TARGET_MASK[player]
+        self.in_target[player] += (target >> destination & 1) - (target >> origin & 1)
+
+    def valid_step(self, cell_1, cell_2):
+        return cell_2 in Game.NEIGHBORS[cell_1] and self.empty(cell_2)
+
+    def valid_jump(self, cell_1, cell_2):
+        for over, landing in Game.JUMPS[cell_1]:
+            if landing == cell_2:
+                return not self.empty(over) and self.empty(landing)
+        return False
 
     def get_winner(self):
         for player in range(1, 7):
-            has_won = True
-            for space in self.HOME[player]:
-                has_won &= self.board[space[0]][space[1]] == self.OPPOSITE[player]
-            if has_won:
+            if self.in_target[self.OPPOSITE[player]] == 10:
                 return player
         return 0
 
     def current_player(self):
         return self.players[self.turn]
 
+    def to_snapshot(self):
+        return {
+            "players": self.players,
+            "turn": self.turn,
+            "masks": self.masks,
+            "prev_moves": self.prev_moves,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        game = cls(snapshot["players"])
+        game.turn = snapshot["turn"]
+        game.masks = list(snapshot["masks"])
+        game.recount()
+        game.prev_moves = snapshot["prev_moves"]
+        return game
+
     def next_turn(self):
         self.turn += 1
         self.turn %= self.num_players
 
 
+def iter_cells(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class EvaluationCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        score = self.entries.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return score
+
+    def put(self, key, score):
+        self.entries[key] = score
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
 class BotMove:
-    DISTANCE = {}
+    CACHE = EvaluationCache(maxsize=1 << 16)
+    DISTANCE = []
+    TARGET_COLUMNS = {}
+    DISTANCE_ARRAY = None
+    TARGET_ARRAYS = {}
+    POWER_ARRAY = None
+    BATCH_THRESHOLD = 40
 
-    def __init__(self, game):
+    def __init__(self, game, batch=None):
         self.game = copy.deepcopy(game)
+        self.batch = batch
+        self.generation = 0
+        self.visited = [0] * len(Game.CELLS)
+        self.component = [0] * len(Game.CELLS)
+        self.component_masks = []
 
     def get_best_move(self):
-        best_score = self.calculate_score()
-        options = [[]]
-        possible_moves = self.get_all_possible_moves()
-        for move in possible_moves:
-            if len(move) == 0:
-                continue
-            x1, y1 = move[0]
-            x2, y2 = move[-1]
-            self.game.board[x1][y1], self.game.board[x2][y2] = self.game.board[x2][y2], self.game.board[x1][y1]
-            score = self.calculate_score()
+        player = self.game.current_player()
+        evaluator = ScoreEvaluator(self.game, player)
+        best_score = self.cached_score(self.game.hash, player, evaluator.score)
+        options = [None]
+        endpoints = self.get_all_possible_endpoints()
+        scores = self.score_moves(player, evaluator, endpoints)
+        for endpoint, score in zip(endpoints, scores):
             if score < best_score:
                 best_score = score
                 options = []
             if score == best_score:
-                options.append(move)
-            self.game.board[x1][y1], self.game.board[x2][y2] = self.game.board[x2][y2], self.game.board[x1][y1]
-        return random.choice(options)
+                options.append(endpoint)
+        choice = random.choice(options)
+        return self.get_path(*choice) if choice is not None else []
+
+    def cached_score(self, position_hash, player, evaluate):
+        key = (position_hash, player, self.game.num_players)
+        score = BotMove.CACHE.get(key)
+        if score is None:
+            score = evaluate()
+            BotMove.CACHE.put(key, score)
+        return score
+
+    def score_moves(self, player, evaluator, endpoints):
+        zobrist = Game.ZOBRIST[player]
+        keys = [(self.game.hash ^ zobrist[origin] ^ zobrist[destination], player, self.game.num_players)
+                for origin, destination in endpoints]
+        scores = [BotMove.CACHE.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if self.batch or (self.batch is None and len(missing) >= BotMove.BATCH_THRESHOLD):
+            computed = BatchScoreEvaluator(self.game, player).score_moves([endpoints[i] for i in missing])
+        else:
+            computed = [evaluator.score_move(*endpoints[i]) for i in missing]
+        for i, score in zip(missing, computed):
+            scores[i] = score
+            BotMove.CACHE.put(keys[i], score)
+        return scores
+
+    def get_fallback_move(self):
+        player = self.game.current_player()
+        center = BotMove.DISTANCE[Game.CELL_ID[8][8]]
+        distance = BotMove.DISTANCE[max(Game.HOME_CELLS[Game.OPPOSITE[player]], key=lambda cell: center[cell])]
+        best_gain = 0
+        options = [None]
+        for origin, destination in self.get_all_possible_endpoints():
+            gain = distance[origin] - distance[destination]
+            if gain > best_gain:
+                best_gain = gain
+                options = []
+            if gain == best_gain:
+                options.append((origin, destination))
+        choice = random.choice(options)
+        return self.get_path(*choice) if choice is not None else []
+
+    def get_all_possible_endpoints(self):
+        self.generation += 1
+        self.component_masks.clear()
+        occupied = self.game.occupied
+        endpoints = []
+        for origin in iter_cells(self.game.masks[self.game.current_player()]):
+            destinations = 0
+            for over, landing in Game.JUMPS[origin]:
+                if occupied >> over & 1 and not occupied >> landing & 1:
+                    destinations |= self.jump_component(landing)
+            destinations |= Game.NEIGHBOR_MASKS[origin] & ~occupied
+            endpoints.extend((origin, destination) for destination in iter_cells(destinations))
+        return endpoints
+
+    def jump_component(self, cell):
+        if self.visited[cell] == self.generation:
+            return self.component_masks[self.component[cell]]
+        occupied = self.game.occupied
+        label = len(self.component_masks)
+        mask = 1 << cell
+        self.visited[cell] = self.generation
+        self.component[cell] = label
+        stack = [cell]
+        while len(stack) > 0:
+            node = stack.pop()
+            for over, landing in Game.JUMPS[node]:
+                if occupied >> over & 1 and not occupied >> landing & 1 and self.visited[landing] != self.generation:
+                    self.visited[landing] = self.generation
+                    self.component[landing] = label
+                    mask |= 1 << landing
+                    stack.append(landing)
+        self.component_masks.append(mask)
+        return mask
+
+    def get_path(self, origin, destination):
+        occupied = self.game.occupied
+        back = [-1] * len(Game.CELLS)
+        back[origin] = origin
+        dq = deque()
+        dq.append(origin)
+        while len(dq) > 0 and back[destination] == -1:
+            node = dq.popleft()
+            for over, landing in Game.JUMPS[node]:
+                if occupied >> over & 1 and not occupied >> landing & 1 and back[landing] == -1:
+                    back[landing] = node
+                    dq.append(landing)
+        if back[destination] == -1:
+            back[destination] = origin
+        move = []
+        while destination != origin:
+            move.append(Game.CELLS[destination])
+            destination = back[destination]
+        move.append(Game.CELLS[origin])
+        move.reverse()
+        return move
 
     def get_all_possible_moves(self):
         possible_moves = []
-        for x in range(0, self.game.BOARD_SIZE):
-            for y in range(0, self.game.BOARD_SIZE):
-                if self.game.valid_and_occupied_by_current_player(x, y):
-                    tmp = self.get_possible_moves_from_location((x, y))
-                    possible_moves.extend(tmp)
+        for cell in iter_cells(self.game.masks[self.game.current_player()]):
+            possible_moves.extend(self.get_possible_moves_from_location(Game.CELLS[cell]))
         return possible_moves
 
     def get_possible_moves_from_location(self, location):
-        back = [[(-1, -1)] * self.game.BOARD_SIZE for _ in range(self.game.BOARD_SIZE)]
-        back[location[0]][location[1]] = location
+        origin = Game.CELL_ID[location[0]][location[1]]
+        occupied = self.game.occupied
+        back = [-1] * len(Game.CELLS)
+        back[origin] = origin
         dq = deque()
-        dq.append(location)
+        dq.append(origin)
         while len(dq) > 0:
             node = dq.popleft()
-            for d in self.game.DIR:
-                new_x = node[0] + d[0] * 2
-                new_y = node[1] + d[1] * 2
-                if self.game.valid_jump_two_spaces(node, (new_x, new_y)) and back[new_x][new_y] == (-1, -1):
-                    back[new_x][new_y] = node
-                    dq.append((new_x, new_y))
-        for d in self.game.DIR:
-            new_x = location[0] + d[0]
-            new_y = location[1] + d[1]
-            if self.game.valid_jump_one_space(location, (new_x, new_y)) and back[new_x][new_y] == (-1, -1):
-                back[new_x][new_y] = location
+            for over, landing in Game.JUMPS[node]:
+                if occupied >> over & 1 and not occupied >> landing & 1 and back[landing] == -1:
+                    back[landing] = node
+                    dq.append(landing)
+        for neighbor in Game.NEIGHBORS[origin]:
+            if not occupied >> neighbor & 1 and back[neighbor] == -1:
+                back[neighbor] = origin
         possible_moves = []
-        for i in range(self.game.BOARD_SIZE):
-            for j in range(self.game.BOARD_SIZE):
-                if back[i][j] == (-1, -1) or (i, j) == location:
-                    continue
-                curr_x = i
-                curr_y = j
-                move = []
-                while curr_x != location[0] or curr_y != location[1]:
-                    move.append((curr_x, curr_y))
-                    curr_x, curr_y = back[curr_x][curr_y]
-                move.append((curr_x, curr_y))
-                move.reverse()
-                possible_moves.append(move)
+        for cell in range(len(Game.CELLS)):
+            if back[cell] == -1 or cell == origin:
+                continue
+            move = []
+            while cell != origin:
+                move.append(Game.CELLS[cell])
+                cell = back[cell]
+            move.append(Game.CELLS[cell])
+            move.reverse()
+            possible_moves.append(move)
         return possible_moves
 
     def calculate_score(self):
         player = self.game.current_player()
-        player_locations = []
-        for i in range(0, self.game.BOARD_SIZE):
-            for j in range(0, self.game.BOARD_SIZE):
-                if self.game.board[i][j] == player:
-                    player_locations.append((i, j))
+        player_locations = self.game.pieces(player)
         weights = [[0] * 11 for _ in range(11)]
         for i in range(10):
             for j in range(10):
-                home_location = self.game.HOME[self.game.OPPOSITE[player]][i]
+                home_location = Game.HOME_CELLS[Game.OPPOSITE[player]][i]
                 player_location = player_locations[j]
                 weights[i + 1][j + 1] = BotMove.DISTANCE[home_location][player_location]
-        INF = float('inf')
-        u = [0] * 11
-        v = [0] * 11
-        p = [0] * 11
-        way = [0] * 11
-        for i in range(1, 11):
-            p[0] = i
-            j0 = 0
-            minv = [INF] * 11
-            used = [False] * 11
-            while True:
-                used[j0] = True
-                i0 = p[j0]
-                delta = INF
-                j1 = 0
-                for j in range(1, 11):
-                    if not used[j]:
-                        cur = weights[i0][j] - u[i0] - v[j]
-                        if cur < minv[j]:
-                            minv[j] = cur
-                            way[j] = j0
-                        if minv[j] < delta:
-                            delta = minv[j]
-                            j1 = j
-                for j in range(11):
-                    if used[j]:
-                        u[p[j]] += delta
-                        v[j] -= delta
-                    else:
-                        minv[j] -= delta
-                j0 = j1
-                if p[j0] == 0:
-                    break
-            while j0:
-                j1 = way[j0]
-                p[j0] = p[j1]
-                j0 = j1
+        p = min_cost_assignment(weights)
         score = 0
         for j in range(1, 11):
             score += weights[p[j]][j] ** 1.4
@@ -307,6 +493,170 @@ class BotMove:
         return int(score)
 
 
+class ScoreEvaluator:
+    def __init__(self, game, player):
+        self.num_players = game.num_players
+        self.columns = BotMove.TARGET_COLUMNS[Game.OPPOSITE[player]]
+        self.cells = game.pieces(player)
+        self.row_sums = {}
+        for cell in self.cells:
+            distance = BotMove.DISTANCE[cell]
+            self.row_sums[cell] = sum(distance[other] for other in self.cells)
+        self.spread = sum(self.row_sums.values())
+
+    def score(self):
+        return self.evaluate(self.cells, self.spread)
+
+    def score_move(self, origin, destination):
+        cells = self.cells.copy()
+        cells.remove(origin)
+        insort(cells, destination)
+        distance = BotMove.DISTANCE[destination]
+        row_sum = sum(distance[other] for other in self.cells) - distance[origin]
+        return self.evaluate(cells, self.spread + 2 * (row_sum - self.row_sums[origin]))
+
+    def evaluate(self, cells, spread):
+        weights = list(zip((0,) * 11, *[self.columns[cell] for cell in cells]))
+        p = min_cost_assignment(weights)
+        score = 0
+        for j in range(1, 11):
+            score += weights[p[j]][j] ** 1.4
+        total = score + spread / (10 * self.num_players)
+        if not near_integer(total):
+            return int(total)
+        for i in cells:
+            distance = BotMove.DISTANCE[i]
+            for j in cells:
+                score += distance[j] / (10 * self.num_players)
+        return int(score)
+
+
+class BatchScoreEvaluator:
+    def __init__(self, game, player):
+        self.num_players = game.num_players
+        self.targets = BotMove.TARGET_ARRAYS[Game.OPPOSITE[player]]
+        self.cells = np.fromiter(iter_cells(game.masks[player]), dtype=np.intp, count=10)
+
+    def score_moves(self, endpoints):
+        if len(endpoints) == 0:
+            return []
+        endpoints = np.array(endpoints, dtype=np.intp)
+        cells = np.tile(self.cells, (len(endpoints), 1))
+        cells[cells == endpoints[:, :1]] = endpoints[:, 1]
+        cells.sort(axis=1)
+        weights = np.zeros((len(cells), 11, 11), dtype=np.intp)
+        weights[:, 1:, 1:] = self.targets[cells].transpose(0, 2, 1)
+        p = batch_min_cost_assignment(weights)
+        assigned = np.take_along_axis(weights, p[:, None, :], axis=1)[:, 0, :]
+        powers = BotMove.POWER_ARRAY[assigned]
+        score = np.zeros(len(cells))
+        for j in range(1, 11):
+            score += powers[:, j]
+        distance = BotMove.DISTANCE_ARRAY
+        spread = distance[cells[:, :, None], cells[:, None, :]].sum(axis=(1, 2))
+        total = score + spread / (10 * self.num_players)
+        exact = near_integer(total)
+        if exact.any():
+            rows = cells[exact]
+            partial = score[exact]
+            for i in range(10):
+                for j in range(10):
+                    partial += distance[rows[:, i], rows[:, j]] / (10 * self.num_players)
+            total[exact] = partial
+        return np.trunc(total).astype(int).tolist()
+
+
+def near_integer(total):
+    # calculate_score adds the spread one term at a time, which can land just below an integer
+    return (total + 1e-9) % 1 <= 2e-9
+
+
+def batch_min_cost_assignment(weights):
+    n = len(weights)
+    u = np.zeros((n, 11), dtype=np.intp)
+    v = np.zeros((n, 11), dtype=np.intp)
+    p = np.zeros((n, 11), dtype=np.intp)
+    way = np.zeros((n, 11), dtype=np.intp)
+    big = np.iinfo(np.intp).max
+    for i in range(1, 11):
+        p[:, 0] = i
+        j0 = np.zeros(n, dtype=np.intp)
+        minv = np.full((n, 11), big)
+        used = np.zeros((n, 11), dtype=bool)
+        active = np.arange(n)
+        while len(active) > 0:
+            rows = np.arange(len(active))
+            j0_active = j0[active]
+            used[active, j0_active] = True
+            i0 = p[active, j0_active]
+            cur = weights[active, i0, :] - u[active, i0][:, None] - v[active]
+            free = ~used[active]
+            minv_active = minv[active]
+            update = free & (cur < minv_active)
+            minv_active = np.where(update, cur, minv_active)
+            way[active] = np.where(update, j0_active[:, None], way[active])
+            j1 = np.argmin(np.where(free, minv_active, big), axis=1)
+            delta = minv_active[rows, j1]
+            used_rows, used_columns = np.nonzero(~free)
+            owners = active[used_rows]
+            u[owners, p[owners, used_columns]] += delta[used_rows]
+            v[owners, used_columns] -= delta[used_rows]
+            minv[active] = np.where(free, minv_active - delta[:, None], minv_active)
+            j0[active] = j1
+            active = active[p[active, j1] != 0]
+        while True:
+            pending = np.nonzero(j0)[0]
+            if len(pending) == 0:
+                break
+            j1 = way[pending, j0[pending]]
+            p[pending, j0[pending]] = p[pending, j1]
+            j0[pending] = j1
+    return p
+
+
+def min_cost_assignment(weights):
+    INF = float('inf')
+    u = [0] * 11
+    v = [0] * 11
+    p = [0] * 11
+    way = [0] * 11
+    for i in range(1, 11):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * 11
+        used = [0]
+        free = list(range(1, 11))
+        while True:
+            i0 = p[j0]
+            row = weights[i0]
+            u_i0 = u[i0]
+            delta = INF
+            j1 = 0
+            for j in free:
+                cur = row[j] - u_i0 - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+            for j in used:
+                u[p[j]] += delta
+                v[j] -= delta
+            for j in free:
+                minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+            used.append(j0)
+            free.remove(j0)
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return p
+
+
 def callonce(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
@@ -318,28 +668,119 @@ def callonce(f):
     return wrapper
 
 
+GEOMETRY_PATH = os.environ.get("GEOMETRY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "geometry.bin"))
+GEOMETRY_VERSION = 1
+GEOMETRY_HEADER = struct.Struct("<6sHH8s")
+NO_CELL = 255
+
+
+def geometry_fingerprint():
+    return hashlib.sha1(repr((Game.BOARD_SIZE, Game.LIMITS, Game.HOME, Game.DIR)).encode()).digest()[:8]
+
+
+def build_geometry():
+    cells = [(x, y) for x in range(Game.BOARD_SIZE) for y in range(Game.BOARD_SIZE) if Game.valid(x, y)]
+    ids = {cell: i for i, cell in enumerate(cells)}
+    neighbors = bytearray([NO_CELL]) * (len(cells) * 6)
+    jumps = bytearray([NO_CELL]) * (len(cells) * 12)
+    for i, (x, y) in enumerate(cells):
+        for k, d in enumerate(Game.DIR):
+            over = ids.get((x + d[0], y + d[1]))
+            landing = ids.get((x + d[0] * 2, y + d[1] * 2))
+            if over is None:
+                continue
+            neighbors[i * 6 + k] = over
+            if landing is not None:
+                jumps[i * 12 + k * 2] = over
+                jumps[i * 12 + k * 2 + 1] = landing
+    homes = bytes(ids[space] for player in range(1, 7) for space in Game.HOME[player])
+    distances = bytearray(len(cells) * len(cells))
+    for source in range(len(cells)):
+        visited = [False] * len(cells)
+        visited[source] = True
+        dq = deque()
+        dq.append(source)
+        dist = 0
+        while len(dq) > 0:
+            for _ in range(len(dq)):
+                node = dq.popleft()
+                distances[source * len(cells) + node] = dist
+                for neighbor in neighbors[node * 6:node * 6 + 6]:
+                    if neighbor == NO_CELL or visited[neighbor]:
+                        continue
+                    visited[neighbor] = True
+                    dq.append(neighbor)
+            dist += 1
+    header = GEOMETRY_HEADER.pack(b"CCGEOM", GEOMETRY_VERSION, len(cells), geometry_fingerprint())
+    return header + bytes(coordinate for cell in cells for coordinate in cell) + neighbors + jumps + homes + distances
+
+
+def read_geometry(path):
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(buffer) < GEOMETRY_HEADER.size:
+        return None
+    magic, version, num_cells, fingerprint = GEOMETRY_HEADER.unpack_from(buffer)
+    if (magic != b"CCGEOM" or version != GEOMETRY_VERSION or fingerprint != geometry_fingerprint() or
+            len(buffer) != GEOMETRY_HEADER.size + num_cells * (2 + 6 + 12 + num_cells) + 60):
+        return None
+    return buffer
+
+
+def write_geometry(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
 @callonce
-def precompute_distances():
-    for y in range(0, Game.BOARD_SIZE):
-        for x in range(Game.LIMITS[y][0], Game.LIMITS[y][1]):
-            BotMove.DISTANCE[(x, y)] = {}
-            visited = [[False] * Game.BOARD_SIZE for _ in range(Game.BOARD_SIZE)]
-            visited[x][y] = True
-            dq = deque()
-            dq.append((x, y))
-            dist = 0
-            while len(dq) > 0:
-                for _ in range(len(dq)):
-                    node = dq.popleft()
-                    BotMove.DISTANCE[(x, y)][node] = dist
-                    for d in Game.DIR:
-                        new_x = node[0] + d[0]
-                        new_y = node[1] + d[1]
-                        if not Game.valid(new_x, new_y) or visited[new_x][new_y]:
-                            continue
-                        visited[new_x][new_y] = True
-                        dq.append((new_x, new_y))
-                dist += 1
-
-
-precompute_distances()
+def load_geometry():
+    buffer = read_geometry(GEOMETRY_PATH)
+    if buffer is None:
+        data = build_geometry()
+        write_geometry(GEOMETRY_PATH, data)
+        buffer = read_geometry(GEOMETRY_PATH) or data
+    view = memoryview(buffer)
+    n = GEOMETRY_HEADER.unpack_from(buffer)[2]
+    offset = GEOMETRY_HEADER.size
+    cells = view[offset:offset + n * 2]
+    neighbors = view[offset + n * 2:offset + n * 8]
+    jumps = view[offset + n * 8:offset + n * 20]
+    homes = view[offset + n * 20:offset + n * 20 + 60]
+    distances = view[offset + n * 20 + 60:]
+
+    Game.CELLS = [(cells[i * 2], cells[i * 2 + 1]) for i in range(n)]
+    Game.CELL_ID = [[-1] * Game.BOARD_SIZE for _ in range(Game.BOARD_SIZE)]
+    for i, (x, y) in enumerate(Game.CELLS):
+        Game.CELL_ID[x][y] = i
+    Game.NEIGHBORS = [[c for c in neighbors[i * 6:i * 6 + 6] if c != NO_CELL] for i in range(n)]
+    Game.NEIGHBOR_MASKS = [sum(1 << neighbor for neighbor in neighbor_list) for neighbor_list in Game.NEIGHBORS]
+    Game.JUMPS = [[(jumps[i * 12 + k * 2], jumps[i * 12 + k * 2 + 1]) for k in range(6)
+                   if jumps[i * 12 + k * 2] != NO_CELL] for i in range(n)]
+    rng = random.Random(0)
+    Game.ZOBRIST = [[rng.getrandbits(64) for _ in Game.CELLS] for _ in range(7)]
+    for player in range(1, 7):
+        Game.HOME_CELLS[player] = list(homes[(player - 1) * 10:player * 10])
+        Game.HOME_MASK[player] = sum(1 << cell for cell in Game.HOME_CELLS[player])
+    for player in range(1, 7):
+        Game.TARGET_MASK[player] = Game.HOME_MASK[Game.OPPOSITE[player]]
+
+    BotMove.DISTANCE = [distances[i * n:(i + 1) * n] for i in range(n)]
+    BotMove.DISTANCE_ARRAY = np.frombuffer(buffer, dtype=np.uint8, count=n * n,
+                                           offset=offset + n * 20 + 60).reshape(n, n)
+    for player, spaces in Game.HOME_CELLS.items():
+        BotMove.TARGET_COLUMNS[player] = [
+            (0,) + tuple(BotMove.DISTANCE[space][location] for space in spaces) for location in range(n)
+        ]
+        BotMove.TARGET_ARRAYS[player] = BotMove.DISTANCE_ARRAY[spaces].T.astype(np.intp)
+    BotMove.POWER_ARRAY = np.array([distance ** 1.4 for distance in range(Game.BOARD_SIZE * 2)])
+
+
+load_geometry()
@@ -0,0 +1,39 @@
+import random
+
+
+class IdAllocator:
+    ROUNDS = 4
+    MULTIPLIER = 0x45D9F3B
+
+    def __init__(self, in_use, digits=8, seed=None):
+        self.in_use = in_use
+        self.digits = digits
+        self.size = 10 ** digits
+        self.half_bits = ((self.size - 1).bit_length() + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed) if seed is not None else random.SystemRandom()
+        self.keys = [rng.getrandbits(32) for _ in range(self.ROUNDS)]
+        self.counter = rng.randrange(self.size)
+
+    def round_function(self, value, key):
+        value = ((value ^ key) * self.MULTIPLIER) & 0xFFFFFFFF
+        value ^= value >> 15
+        return value & self.half_mask
+
+    def permute(self, value):
+        while True:
+            left, right = value >> self.half_bits, value & self.half_mask
+            for key in self.keys:
+                left, right = right, left ^ self.round_function(right, key)
+            value = left << self.half_bits | right
+            if value < self.size:
+                return value
+
+    def allocate(self):
+        if len(self.in_use) >= self.size:
+            raise RuntimeError("No free ids left")
+        while True:
+            candidate = str(self.permute(self.counter)).zfill(self.digits)
+            self.counter = (self.counter + 1) % self.size
+            if candidate not in self.in_use:
+                return candidate
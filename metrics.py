@@ -0,0 +1,138 @@
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+
+def format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if len(pairs) == 0:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.children = {}
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, child in self.children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, values, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, values)} {child.sum}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}
+        REGISTRY.append(self)
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for values, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labelnames, values)} {value}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for values, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labelnames, values)} {value}")
+        return lines
+
+
+def generate_latest():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+async def monitor_event_loop_lag(gauge: Gauge, interval=0.5):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        gauge.set(max(0.0, time.perf_counter() - start - interval))
+
+
+BOT_THINK_SECONDS = Histogram("bot_think_seconds", "Time to get a bot move from the bot engine.", ("difficulty",))
+GAME_STATE_ENCODE_SECONDS = Histogram("game_state_encode_seconds", "Time to build and encode a room broadcast.")
+GAME_STATE_FANOUT_SECONDS = Histogram("game_state_fanout_seconds", "Time to queue a room broadcast for every socket.")
+WEBSOCKET_MESSAGE_SECONDS = Histogram("websocket_message_seconds", "Time to handle a WebSocket message.", ("type",))
+EVENT_LOOP_LAG_SECONDS = Gauge("event_loop_lag_seconds", "Delay of a periodic event loop wakeup.")
+GAME_ROOMS = Gauge("game_rooms", "Game rooms by status.", ("status",))
+CONNECTED_PLAYERS = Gauge("connected_players", "Players with an open WebSocket.")
+SPECTATORS = Gauge("spectators", "Sockets watching a room without playing.")
+BOTS = Gauge("bots", "Bot players, including disconnected players replaced by bots.")
+PENDING_TASKS = Gauge("pending_tasks", "Tasks scheduled on the event loop.")
+BOT_QUEUE_DEPTH = Gauge("bot_queue_depth", "Rooms waiting for a bot move slot.")
+BOT_MOVES_RUNNING = Gauge("bot_moves_running", "Bot moves being computed.")
+PENDING_TIMERS = Gauge("pending_timers", "Reconnect and room deletion timers waiting to fire.")
+OUTBOUND_QUEUED_FRAMES = Gauge("outbound_queued_frames", "Frames waiting in the outbound queues of all sockets.")
+OUTBOUND_FRAMES_DROPPED = Counter("outbound_frames_dropped_total", "Game states replaced by a newer one before "
+                                                                   "being sent.")
+SLOW_CLIENTS_DISCONNECTED = Counter("slow_clients_disconnected_total", "Sockets closed for not keeping up with their "
+                                                                       "outbound queue.", ("reason",))
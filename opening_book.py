@@ -0,0 +1,134 @@
+import argparse
+import itertools
+import mmap
+import os
+import random
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from game import Game, BotMove, ScoreEvaluator, geometry_fingerprint
+from search import BotSearch
+
+BOOK_PATH = os.environ.get("OPENING_BOOK_PATH",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin"))
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct("<6sHI8s")
+TURN_KEYS = [random.Random(1).getrandbits(64) for _ in range(7)]
+
+
+def book_key(game: Game):
+    return game.hash ^ TURN_KEYS[game.current_player()]
+
+
+class OpeningBook:
+    def __init__(self, buffer):
+        count = BOOK_HEADER.unpack_from(buffer)[2]
+        self.keys = np.frombuffer(buffer, dtype="<u8", count=count, offset=BOOK_HEADER.size)
+        self.moves = np.frombuffer(buffer, dtype=np.uint8, count=count * 2,
+                                   offset=BOOK_HEADER.size + count * 8).reshape(count, 2)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def load(cls, path=BOOK_PATH):
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(buffer) < BOOK_HEADER.size:
+            return None
+        magic, version, count, fingerprint = BOOK_HEADER.unpack_from(buffer)
+        if (magic != b"CCBOOK" or version != BOOK_VERSION or fingerprint != geometry_fingerprint() or
+                len(buffer) != BOOK_HEADER.size + count * 10):
+            return None
+        return cls(buffer)
+
+    def get_move(self, game: Game):
+        key = np.uint64(book_key(game))
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        bot = BotMove(game)
+        origin, destination = int(self.moves[i][0]), int(self.moves[i][1])
+        if (origin, destination) not in bot.get_all_possible_endpoints():
+            return None
+        return bot.get_path(origin, destination)
+
+
+def write_book(path, entries):
+    keys = sorted(entries)
+    header = BOOK_HEADER.pack(b"CCBOOK", BOOK_VERSION, len(keys), geometry_fingerprint())
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(np.array(keys, dtype="<u8").tobytes())
+        f.write(bytes(cell for key in keys for cell in entries[key]))
+    os.replace(tmp_path, path)
+
+
+def search_position(snapshot, time_budget, width):
+    game = Game.from_snapshot(snapshot)
+    random.seed(book_key(game))
+    move = BotSearch(game, time_budget).get_best_move()
+    if len(move) == 0:
+        return None, []
+    best = (Game.cell_id(*move[0]), Game.cell_id(*move[-1]))
+    bot = BotMove(game)
+    player = game.current_player()
+    endpoints = bot.get_all_possible_endpoints()
+    scores = bot.score_moves(player, ScoreEvaluator(game, player), endpoints)
+    likely = [endpoints[i] for i in sorted(range(len(endpoints)), key=lambda i: scores[i])]
+    children = [best] + [endpoint for endpoint in likely if endpoint != best][:width - 1]
+    return best, children
+
+
+def generate_book(configurations, plies, width, time_budget, processes):
+    entries = {}
+    level = [Game(players) for players in configurations]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for ply in range(plies):
+            level = [game for game in level if not game.get_winner() and book_key(game) not in entries]
+            unique = list({book_key(game): game for game in level}.values())
+            results = executor.map(search_position, [game.to_snapshot() for game in unique],
+                                   itertools.repeat(time_budget), itertools.repeat(width))
+            level = []
+            for game, (best, children) in zip(unique, results):
+                if best is None:
+                    continue
+                entries[book_key(game)] = best
+                for origin, destination in children:
+                    child = Game.from_snapshot(game.to_snapshot())
+                    child.move_piece(child.current_player(), origin, destination)
+                    child.next_turn()
+                    level.append(child)
+            print(f"ply {ply + 1}: {len(entries)} positions")
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the opening book used by the searching bots.")
+    parser.add_argument("--output", default=BOOK_PATH)
+    parser.add_argument("--players", nargs="*", help="player configurations such as 1,4 (defaults to every "
+                                                     "combination of 2 to 6 colors)")
+    parser.add_argument("--plies", type=int, default=8, help="number of moves covered from the start")
+    parser.add_argument("--width", type=int, default=2, help="replies followed from every book position")
+    parser.add_argument("--time", type=float, default=2.0, help="search time per position in seconds")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.players:
+        configurations = [sorted(int(player) for player in players.split(",")) for players in args.players]
+    else:
+        configurations = [list(players) for size in range(2, 7)
+                          for players in itertools.combinations(range(1, 7), size)]
+    entries = generate_book(configurations, args.plies, args.width, args.time, args.processes)
+    write_book(args.output, entries)
+    print(f"wrote {len(entries)} positions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import asyncio
+import os
+
+import orjson
+
+
+class RoomLog:
+    SEGMENT_PREFIX = "segment-"
+    SNAPSHOT_PREFIX = "snapshot-"
+
+    def __init__(self, directory, flush_interval=0.05, compact_bytes=1 << 24):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.compact_bytes = compact_bytes
+        self.pending = []
+        self.segment = None
+        self.segment_number = 0
+        self.segment_bytes = 0
+        self.flusher = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, prefix, number):
+        return os.path.join(self.directory, f"{prefix}{number:08d}")
+
+    def list_files(self, prefix):
+        return sorted(int(name[len(prefix):]) for name in os.listdir(self.directory)
+                      if name.startswith(prefix) and name[len(prefix):].isdigit())
+
+    def load(self):
+        snapshots = self.list_files(self.SNAPSHOT_PREFIX)
+        segments = self.list_files(self.SEGMENT_PREFIX)
+        rooms = {}
+        first_segment = 0
+        if len(snapshots) > 0:
+            first_segment = snapshots[-1]
+            with open(self.path(self.SNAPSHOT_PREFIX, first_segment), "rb") as f:
+                rooms = orjson.loads(f.read())
+        records = []
+        for number in segments:
+            if number < first_segment:
+                continue
+            with open(self.path(self.SEGMENT_PREFIX, number), "rb") as f:
+                for line in f:
+                    try:
+                        records.append(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        break
+        self.segment_number = max(segments + snapshots + [-1]) + 1
+        return rooms, records
+
+    def append(self, record):
+        self.pending.append(orjson.dumps(record) + b"\n")
+
+    def start(self, get_snapshot):
+        self.open_segment()
+        self.flusher = asyncio.create_task(self.flush_periodically(get_snapshot))
+
+    def open_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+        self.segment = open(self.path(self.SEGMENT_PREFIX, self.segment_number), "ab")
+        self.segment_bytes = 0
+
+    def write_pending(self):
+        if len(self.pending) == 0:
+            return False
+        data = b"".join(self.pending)
+        self.pending = []
+        self.segment.write(data)
+        self.segment_bytes += len(data)
+        return True
+
+    async def flush(self):
+        if self.write_pending():
+            self.segment.flush()
+            await asyncio.to_thread(os.fsync, self.segment.fileno())
+
+    async def flush_periodically(self, get_snapshot):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if self.segment_bytes > self.compact_bytes:
+                await self.compact(get_snapshot())
+
+    async def compact(self, rooms):
+        self.write_pending()
+        self.segment.flush()
+        os.fsync(self.segment.fileno())
+        self.segment_number += 1
+        self.open_segment()
+        number = self.segment_number
+        data = orjson.dumps(rooms)
+        await asyncio.to_thread(self.write_snapshot, number, data)
+
+    def write_snapshot(self, number, data):
+        path = self.path(self.SNAPSHOT_PREFIX, number)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        for prefix in (self.SEGMENT_PREFIX, self.SNAPSHOT_PREFIX):
+            for old in self.list_files(prefix):
+                if old < number:
+                    os.unlink(self.path(prefix, old))
+
+    async def close(self):
+        if self.flusher is not None:
+            self.flusher.cancel()
+            self.flusher = None
+        if self.segment is not None:
+            await self.flush()
+            self.segment.close()
+            self.segment = None
@@ -0,0 +1,122 @@
+import random
+import time
+
+from game import Game, BotMove, ScoreEvaluator
+
+DIFFICULTIES = {
+    "easy": None,
+    "medium": 0.5,
+    "hard": 2.0,
+}
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class BotSearch:
+    WIN = 1 << 20
+    MAX_DEPTH = 8
+
+    def __init__(self, game, time_budget, node_budget=None):
+        self.bot = BotMove(game)
+        self.game = self.bot.game
+        self.root_player = self.game.current_player()
+        self.time_budget = time_budget
+        self.node_budget = node_budget
+        self.deadline = None
+        self.nodes = 0
+        self.best_first = None
+
+    def get_best_move(self):
+        if len(self.bot.get_all_possible_endpoints()) == 0:
+            return []
+        self.deadline = time.perf_counter() + self.time_budget
+        options = self.search_root(1, check_budget=False)
+        for depth in range(2, self.MAX_DEPTH + 1):
+            try:
+                options = self.search_root(depth, check_budget=True)
+            except SearchTimeout:
+                break
+        return self.bot.get_path(*random.choice(options))
+
+    def search_root(self, depth, check_budget):
+        best_value = -self.WIN - 1
+        options = []
+        for origin, destination in self.ordered_moves(self.root_player):
+            self.play(self.root_player, origin, destination)
+            try:
+                # values above best_value - 1 are exact, so ties with the best move are real ties
+                value = self.search(depth - 1, best_value - 1, self.WIN + 1, check_budget)
+            finally:
+                self.undo(self.root_player, origin, destination)
+            if value > best_value:
+                best_value = value
+                options = []
+            if value == best_value:
+                options.append((origin, destination))
+        self.best_first = options[0]
+        return options
+
+    def search(self, depth, alpha, beta, check_budget):
+        self.nodes += 1
+        if check_budget and (time.perf_counter() > self.deadline or
+                             (self.node_budget is not None and self.nodes > self.node_budget)):
+            raise SearchTimeout()
+        winner = self.game.get_winner()
+        if winner:
+            return self.WIN if Game.OPPOSITE[winner] == self.root_player else -self.WIN
+        if depth == 0:
+            return self.evaluate()
+        player = self.game.current_player()
+        moves = self.ordered_moves(player)
+        if len(moves) == 0:
+            self.game.next_turn()
+            try:
+                return self.search(depth - 1, alpha, beta, check_budget)
+            finally:
+                self.game.turn = (self.game.turn - 1) % self.game.num_players
+        maximizing = player == self.root_player
+        value = -self.WIN - 1 if maximizing else self.WIN + 1
+        for origin, destination in moves:
+            self.play(player, origin, destination)
+            try:
+                child = self.search(depth - 1, alpha, beta, check_budget)
+            finally:
+                self.undo(player, origin, destination)
+            if maximizing:
+                value = max(value, child)
+                alpha = max(alpha, value)
+            else:
+                value = min(value, child)
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        return value
+
+    def ordered_moves(self, player):
+        endpoints = self.bot.get_all_possible_endpoints()
+        scores = self.bot.score_moves(player, ScoreEvaluator(self.game, player), endpoints)
+        order = sorted(range(len(endpoints)), key=lambda i: scores[i])
+        moves = [endpoints[i] for i in order]
+        if player == self.root_player and self.best_first in moves:
+            moves.remove(self.best_first)
+            moves.insert(0, self.best_first)
+        return moves
+
+    def evaluate(self):
+        scores = {}
+        for player in self.game.players:
+            scores[player] = self.bot.cached_score(self.game.hash, player, ScoreEvaluator(self.game, player).score)
+        root_score = scores.pop(self.root_player)
+        if len(scores) == 0:
+            return -root_score
+        return min(scores.values()) - root_score
+
+    def play(self, player, origin, destination):
+        self.game.move_piece(player, origin, destination)
+        self.game.next_turn()
+
+    def undo(self, player, origin, destination):
+        self.game.turn = (self.game.turn - 1) % self.game.num_players
+        self.game.move_piece(player, destination, origin)
@@ -0,0 +1,226 @@
+import asyncio
+import fcntl
+import os
+import time
+from abc import ABC, abstractmethod
+
+import orjson
+import websockets
+
+
+class RoomRegistry(ABC):
+    @abstractmethod
+    async def heartbeat(self, shard, url):
+        pass
+
+    @abstractmethod
+    async def remove_shard(self, shard):
+        pass
+
+    @abstractmethod
+    async def claim_room(self, game_id, shard, url):
+        pass
+
+    @abstractmethod
+    async def release_room(self, game_id):
+        pass
+
+    @abstractmethod
+    async def get_owner(self, game_id):
+        pass
+
+    @abstractmethod
+    async def get_least_loaded_shard(self, prefer=None):
+        pass
+
+    async def close(self):
+        pass
+
+
+class InMemoryRegistry(RoomRegistry):
+    SHARD_TTL = 5.0
+
+    def __init__(self):
+        self.shards = {}
+        self.rooms = {}
+
+    def expire_shards(self):
+        now = time.monotonic()
+        for shard in [shard for shard, entry in self.shards.items() if now - entry["seen"] > self.SHARD_TTL]:
+            self.drop_shard(shard)
+
+    def drop_shard(self, shard):
+        for game_id in self.shards.pop(shard)["rooms"]:
+            del self.rooms[game_id]
+
+    async def heartbeat(self, shard, url):
+        known = shard in self.shards
+        if not known:
+            self.shards[shard] = {"url": url, "rooms": set(), "seen": 0}
+        self.shards[shard]["url"] = url
+        self.shards[shard]["seen"] = time.monotonic()
+        return known
+
+    async def remove_shard(self, shard):
+        if shard in self.shards:
+            self.drop_shard(shard)
+
+    async def claim_room(self, game_id, shard, url):
+        if game_id in self.rooms:
+            return False
+        await self.heartbeat(shard, url)
+        self.rooms[game_id] = shard
+        self.shards[shard]["rooms"].add(game_id)
+        return True
+
+    async def release_room(self, game_id):
+        shard = self.rooms.pop(game_id, None)
+        if shard is not None:
+            self.shards[shard]["rooms"].discard(game_id)
+
+    async def get_owner(self, game_id):
+        self.expire_shards()
+        shard = self.rooms.get(game_id)
+        if shard is None:
+            return None
+        return shard, self.shards[shard]["url"]
+
+    async def get_least_loaded_shard(self, prefer=None):
+        self.expire_shards()
+        if len(self.shards) == 0:
+            return None
+        shard = min(self.shards, key=lambda s: (len(self.shards[s]["rooms"]), s != prefer, s))
+        return shard, self.shards[shard]["url"]
+
+
+class SocketRegistry(RoomRegistry):
+    OPERATIONS = ("heartbeat", "remove_shard", "claim_room", "release_room", "get_owner", "get_least_loaded_shard")
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_file = None
+        self.server = None
+        self.clients = set()
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock()
+
+    async def serve_if_unclaimed(self):
+        if self.server is not None:
+            return
+        if self.lock_file is None:
+            self.lock_file = open(self.path + ".lock", "w")
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        registry = InMemoryRegistry()
+
+        async def handle(reader, writer):
+            self.clients.add(writer)
+            try:
+                while line := await reader.readline():
+                    request = orjson.loads(line)
+                    if request["op"] not in self.OPERATIONS:
+                        result = None
+                    else:
+                        result = await getattr(registry, request["op"])(*request["args"])
+                    writer.write(orjson.dumps(result) + b"\n")
+                    await writer.drain()
+            except (ConnectionError, orjson.JSONDecodeError):
+                pass
+            finally:
+                self.clients.discard(writer)
+                writer.close()
+
+        self.server = await asyncio.start_unix_server(handle, self.path)
+
+    async def connect(self):
+        for _ in range(50):
+            await self.serve_if_unclaimed()
+            try:
+                self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(0.1)
+        raise ConnectionError("Room registry is not reachable at " + self.path)
+
+    async def call(self, op, *args):
+        async with self.lock:
+            for attempt in range(2):
+                if self.writer is None:
+                    await self.connect()
+                try:
+                    self.writer.write(orjson.dumps({"op": op, "args": args}) + b"\n")
+                    await self.writer.drain()
+                    line = await self.reader.readline()
+                    if not line:
+                        raise ConnectionError("Room registry closed the connection")
+                    result = orjson.loads(line)
+                    return tuple(result) if isinstance(result, list) else result
+                except ConnectionError:
+                    self.writer.close()
+                    self.writer = None
+                    if attempt == 1:
+                        raise
+
+    async def heartbeat(self, shard, url):
+        return await self.call("heartbeat", shard, url)
+
+    async def remove_shard(self, shard):
+        return await self.call("remove_shard", shard)
+
+    async def claim_room(self, game_id, shard, url):
+        return await self.call("claim_room", game_id, shard, url)
+
+    async def release_room(self, game_id):
+        return await self.call("release_room", game_id)
+
+    async def get_owner(self, game_id):
+        return await self.call("get_owner", game_id)
+
+    async def get_least_loaded_shard(self, prefer=None):
+        return await self.call("get_least_loaded_shard", prefer)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            for writer in self.clients:
+                writer.close()
+            os.unlink(self.path)
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+
+
+async def proxy_websocket(websocket, url, first_message, subprotocol=None):
+    async with websockets.connect(url, subprotocols=[subprotocol] if subprotocol is not None else None) as upstream:
+        await upstream.send(first_message)
+
+        async def client_to_upstream():
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                await upstream.send(message["bytes"] if message.get("bytes") is not None else message["text"])
+
+        async def upstream_to_client():
+            async for message in upstream:
+                if isinstance(message, bytes):
+                    await websocket.send_bytes(message)
+                else:
+                    await websocket.send_text(message)
+
+        tasks = [asyncio.create_task(client_to_upstream()), asyncio.create_task(upstream_to_client())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,72 @@
+import asyncio
+
+
+class SpectatorStream:
+    def __init__(self, timer_wheel, delay=0.0, interval=0.0):
+        self.timer_wheel = timer_wheel
+        self.delay = delay
+        self.interval = interval
+        self.spectators = set()
+        self.latest = None
+        self.pending = None
+        self.last_sent = None
+        self.timers = set()
+
+    def __len__(self):
+        return len(self.spectators)
+
+    def encodings(self):
+        return {spectator.binary for spectator in self.spectators}
+
+    def add(self, spectator):
+        self.spectators.add(spectator)
+
+    def remove(self, spectator):
+        self.spectators.discard(spectator)
+
+    def publish(self, frames):
+        if self.delay > 0:
+            self.schedule(self.delay, self.offer, frames)
+        else:
+            asyncio.get_running_loop().call_soon(self.offer, frames)
+
+    def offer(self, frames):
+        now = asyncio.get_running_loop().time()
+        if self.pending is not None:
+            self.pending = frames
+        elif self.last_sent is None or now - self.last_sent >= self.interval:
+            self.deliver(frames)
+        else:
+            self.pending = frames
+            self.schedule(self.last_sent + self.interval - now, self.release)
+
+    def release(self):
+        frames, self.pending = self.pending, None
+        if frames is not None:
+            self.deliver(frames)
+
+    def deliver(self, frames):
+        self.latest = frames
+        self.last_sent = asyncio.get_running_loop().time()
+        for spectator in self.spectators:
+            frame = frames.get(spectator.binary)
+            if frame is not None:
+                spectator.send_state(frame, frame)
+
+    def schedule(self, delay, callback, *args):
+        timer = None
+
+        def fire():
+            self.timers.discard(timer)
+            callback(*args)
+
+        timer = self.timer_wheel.schedule(delay, fire)
+        self.timers.add(timer)
+
+    def close(self):
+        for timer in self.timers:
+            self.timer_wheel.cancel(timer)
+        self.timers.clear()
+        self.pending = None
+        spectators, self.spectators = self.spectators, set()
+        return spectators
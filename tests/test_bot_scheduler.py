@@ -0,0 +1,49 @@
+import asyncio
+
+from bot_scheduler import BotScheduler
+from timers import TimerWheel
+
+
+class FakeRoom:
+    def __init__(self):
+        self.done = asyncio.Event()
+
+    def needs_bot_move(self):
+        return True
+
+    def has_connected_humans(self):
+        return True
+
+    async def play_bot_move(self, degraded):
+        await self.done.wait()
+
+
+def test_pondering_never_takes_the_last_slot():
+    scheduler = BotScheduler(TimerWheel(), max_concurrent=3)
+    assert scheduler.acquire_ponder_slot()
+    assert scheduler.acquire_ponder_slot()
+    assert not scheduler.acquire_ponder_slot()
+    assert scheduler.idle()
+    scheduler.release_ponder_slot()
+    scheduler.release_ponder_slot()
+    assert BotScheduler(TimerWheel(), max_concurrent=1).acquire_ponder_slot() is False
+
+
+def test_ponder_slots_count_towards_bot_moves():
+    async def run():
+        scheduler = BotScheduler(TimerWheel(), max_concurrent=2)
+        assert scheduler.acquire_ponder_slot()
+        first, second = FakeRoom(), FakeRoom()
+        scheduler.enqueue(first)
+        scheduler.enqueue(second)
+        assert scheduler.active == {first}
+        assert not scheduler.can_ponder()
+        scheduler.release_ponder_slot()
+        assert scheduler.active == {first, second}
+        assert scheduler.can_ponder(first) is False
+        first.done.set()
+        second.done.set()
+        await asyncio.gather(*scheduler.tasks)
+        assert scheduler.can_ponder()
+
+    asyncio.run(run())
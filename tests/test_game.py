@@ -0,0 +1,28 @@
+import random
+
+import pytest
+
+from game import Game, BotMove
+
+
+def full_scan_winner(game):
+    board = game.board
+    for player in range(1, 7):
+        if all(board[x][y] == Game.OPPOSITE[player] for x, y in Game.HOME[player]):
+            return player
+    return 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("players", [[1, 4], [1, 3, 5], [2, 3, 5, 6], [1, 2, 3, 4, 5, 6]])
+def test_random_games_stay_consistent(seed, players):
+    random.seed(seed)
+    game = Game(players)
+    game.check_consistency()
+    for _ in range(300):
+        bot = BotMove(game)
+        game.make_moves(bot.get_best_move() if random.random() < 0.9 else random.choice(bot.get_all_possible_moves()))
+        game.check_consistency()
+        assert game.get_winner() == full_scan_winner(game)
+        if game.get_winner():
+            break
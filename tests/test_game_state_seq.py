@@ -0,0 +1,66 @@
+from fastapi.testclient import TestClient
+
+import app
+from game import BotMove
+
+
+class Client:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.seq = None
+        self.skip_next_delta = False
+
+    def send(self, message):
+        self.websocket.send_json(message)
+
+    def receive_until(self, message_type):
+        while True:
+            message = self.websocket.receive_json()
+            if message["type"] == "game_state":
+                self.seq = message["seq"]
+            elif message["type"] == "game_delta":
+                if self.skip_next_delta:
+                    self.skip_next_delta = False
+                elif message["seq"] == self.seq + 1:
+                    self.seq = message["seq"]
+                else:
+                    return message
+            if message["type"] == message_type:
+                return message
+
+
+def test_deltas_are_sequenced_and_sync_returns_a_snapshot():
+    with TestClient(app.app) as client:
+        with client.websocket_connect("/ws") as first_socket, client.websocket_connect("/ws") as second_socket:
+            first, second = Client(first_socket), Client(second_socket)
+            first.send({"type": "create", "name": "first"})
+            game_id = first.receive_until("game_state")["id"]
+            first.receive_until("status")
+            second.send({"type": "join", "game_id": game_id, "name": "second"})
+            second.receive_until("status")
+            for player, color in ((first, 1), (second, 4)):
+                player.send({"type": "select_color", "color": color})
+                player.receive_until("status")
+            first.send({"type": "start"})
+            first.receive_until("status")
+            game = app.manager.game_rooms[game_id].game
+            for turn in range(6):
+                player = (first, second)[turn % 2]
+                before = (first.seq, second.seq) if turn > 0 else None
+                player.send({"type": "move", "moves": BotMove(game).get_best_move()})
+                assert player.receive_until("status")["status"] == "Success"
+                other = (second, first)[turn % 2]
+                assert other.receive_until("game_delta")["seq"] == other.seq
+                if before is not None:
+                    assert (first.seq, second.seq) == (before[0] + 1, before[1] + 1)
+
+            second.skip_next_delta = True
+            first.send({"type": "move", "moves": BotMove(game).get_best_move()})
+            first.receive_until("status")
+            second.send({"type": "move", "moves": BotMove(game).get_best_move()})
+            gap = second.receive_until("status")
+            assert gap["type"] == "game_delta" and gap["seq"] == second.seq + 2
+            second.send({"type": "sync"})
+            snapshot = second.receive_until("game_state")
+            assert snapshot["seq"] == gap["seq"] == app.manager.game_rooms[game_id].seq
+            assert snapshot["board"] == game.board
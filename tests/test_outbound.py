@@ -0,0 +1,81 @@
+import asyncio
+
+import app
+from app import PlayerConnection
+from metrics import OUTBOUND_FRAMES_DROPPED, SLOW_CLIENTS_DISCONNECTED
+
+
+class StalledWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.unblock = asyncio.Event()
+        self.closed = False
+
+    async def send_text(self, frame):
+        await self.unblock.wait()
+        self.sent.append(frame)
+
+    async def send_bytes(self, frame):
+        await self.send_text(frame)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_pending_delta_is_replaced_by_a_snapshot():
+    async def run():
+        websocket = StalledWebSocket()
+        connection = PlayerConnection(websocket)
+        connection.send_state("delta 1", "snapshot 1")
+        await asyncio.sleep(0)
+        assert list(connection.outbound) == ["delta 1"]
+        dropped = OUTBOUND_FRAMES_DROPPED.values.get((), 0)
+        connection.send_state("delta 2", "snapshot 2")
+        assert list(connection.outbound) == ["snapshot 2"]
+        assert connection.pending_state == "snapshot 2"
+        assert OUTBOUND_FRAMES_DROPPED.values[()] == dropped + 1
+        connection.send("status")
+        connection.send_state("delta 3", "snapshot 3")
+        assert list(connection.outbound) == ["status", "snapshot 3"]
+        websocket.unblock.set()
+        await connection.close_connection()
+        assert websocket.sent[1:] == ["status", "snapshot 3"]
+        assert connection.pending_state is None
+
+    asyncio.run(run())
+
+
+def test_slow_client_is_dropped_when_its_queue_is_full():
+    async def run():
+        websocket = StalledWebSocket()
+        connection = PlayerConnection(websocket)
+        dropped = SLOW_CLIENTS_DISCONNECTED.values.get(("queue_full",), 0)
+        connection.send("first")
+        await asyncio.sleep(0)
+        for i in range(app.OUTBOUND_QUEUE_SIZE):
+            connection.send(f"frame {i}")
+        assert not connection.closing
+        connection.send_state("delta", "snapshot")
+        assert connection.closing and len(connection.outbound) == 0 and connection.writer is None
+        assert SLOW_CLIENTS_DISCONNECTED.values[("queue_full",)] == dropped + 1
+        await asyncio.sleep(0)
+        assert websocket.closed
+        connection.send("late")
+        assert len(connection.outbound) == 0
+
+    asyncio.run(run())
+
+
+def test_stalled_send_drops_the_client(monkeypatch):
+    monkeypatch.setattr(app, "OUTBOUND_SEND_TIMEOUT", 0.01)
+
+    async def run():
+        websocket = StalledWebSocket()
+        connection = PlayerConnection(websocket)
+        dropped = SLOW_CLIENTS_DISCONNECTED.values.get(("send_timeout",), 0)
+        connection.send("first")
+        await asyncio.sleep(0.1)
+        assert connection.closing and websocket.closed
+        assert SLOW_CLIENTS_DISCONNECTED.values[("send_timeout",)] == dropped + 1
+
+    asyncio.run(run())
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from game import Game, BotMove, ScoreEvaluator, BatchScoreEvaluator, min_cost_assignment, near_integer
+
+
+def generate_positions(seed, count):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = Game(rng.sample(range(1, 7), rng.choice([2, 3, 4, 6])))
+        for _ in range(rng.randint(0, 120)):
+            if game.get_winner():
+                break
+            game.make_moves(rng.choice(BotMove(game).get_all_possible_moves()))
+        if not game.get_winner():
+            positions.append(game)
+    return positions
+
+
+POSITIONS = generate_positions(seed=0, count=20)
+
+
+def scalar_scores(game, endpoints):
+    bot = BotMove(game)
+    player = game.current_player()
+    scores = []
+    for origin, destination in endpoints:
+        bot.game.move_piece(player, origin, destination)
+        scores.append(bot.calculate_score())
+        bot.game.move_piece(player, destination, origin)
+    return scores
+
+
+@pytest.mark.parametrize("game", POSITIONS)
+def test_evaluators_match_calculate_score(game):
+    player = game.current_player()
+    endpoints = BotMove(game).get_all_possible_endpoints()
+    evaluator = ScoreEvaluator(game, player)
+    assert evaluator.score() == BotMove(game).calculate_score()
+    expected = scalar_scores(game, endpoints)
+    assert [evaluator.score_move(origin, destination) for origin, destination in endpoints] == expected
+    assert BatchScoreEvaluator(game, player).score_moves(endpoints) == expected
+
+
+def test_near_integer_totals_match_calculate_score():
+    cells = [73, 83, 85, 94, 95, 96, 97, 108, 109, 110]
+    game = Game([1, 3, 5])
+    game.masks[1] = sum(1 << cell for cell in cells)
+    game.recount()
+    evaluator = ScoreEvaluator(game, 1)
+    weights = list(zip((0,) * 11, *[evaluator.columns[cell] for cell in cells]))
+    p = min_cost_assignment(weights)
+    total = sum(weights[p[j]][j] ** 1.4 for j in range(1, 11)) + evaluator.spread / 30
+    assert near_integer(total) and int(total) == 9
+    assert evaluator.score() == BotMove(game).calculate_score() == 8
+    game.move_piece(1, 73, 64)
+    assert ScoreEvaluator(game, 1).score_move(64, 73) == 8
+    assert BatchScoreEvaluator(game, 1).score_moves([(64, 73)]) == [8]
+
+
+@pytest.mark.parametrize("game", POSITIONS)
+def test_batch_and_scalar_bots_pick_the_same_move(game):
+    moves = []
+    for batch in (True, False):
+        BotMove.CACHE.clear()
+        random.seed(0)
+        moves.append(BotMove(game, batch=batch).get_best_move())
+    BotMove.CACHE.clear()
+    assert moves[0] == moves[1]
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from game import Game, BotMove
+from search import BotSearch
+
+
+def random_position(seed, players, plies):
+    random.seed(seed)
+    game = Game(players)
+    for _ in range(plies):
+        game.make_moves(random.choice(BotMove(game).get_all_possible_moves()))
+    return game
+
+
+class TiedSearch(BotSearch):
+    def evaluate(self):
+        return self.game.masks[self.root_player] % 7 - self.game.hash % 3
+
+
+def minimax(search, depth):
+    winner = search.game.get_winner()
+    if winner:
+        return search.WIN if Game.OPPOSITE[winner] == search.root_player else -search.WIN
+    if depth == 0:
+        return search.evaluate()
+    player = search.game.current_player()
+    moves = search.ordered_moves(player)
+    if len(moves) == 0:
+        search.game.next_turn()
+        try:
+            return minimax(search, depth - 1)
+        finally:
+            search.game.turn = (search.game.turn - 1) % search.game.num_players
+    values = []
+    for origin, destination in moves:
+        search.play(player, origin, destination)
+        try:
+            values.append(minimax(search, depth - 1))
+        finally:
+            search.undo(player, origin, destination)
+    return max(values) if player == search.root_player else min(values)
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("players", [[1, 4], [1, 3, 5]])
+@pytest.mark.parametrize("search_class", [BotSearch, TiedSearch])
+def test_search_root_matches_minimax(seed, players, search_class):
+    game = random_position(seed, players, 6 * len(players))
+    search = search_class(game, time_budget=None)
+    for depth in (1, 2):
+        options = search.search_root(depth, check_budget=False)
+        values = {}
+        for origin, destination in search.ordered_moves(search.root_player):
+            search.play(search.root_player, origin, destination)
+            try:
+                values[origin, destination] = minimax(search, depth - 1)
+            finally:
+                search.undo(search.root_player, origin, destination)
+        best = max(values.values())
+        assert sorted(options) == sorted(move for move, value in values.items() if value == best)
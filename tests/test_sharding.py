@@ -0,0 +1,66 @@
+import asyncio
+
+import sharding
+from sharding import InMemoryRegistry, SocketRegistry
+
+
+def test_claims_owners_and_least_loaded_shard():
+    async def run():
+        registry = InMemoryRegistry()
+        assert await registry.get_least_loaded_shard() is None
+        assert await registry.claim_room("room-1", "a", "ws://a/ws")
+        assert not await registry.claim_room("room-1", "b", "ws://b/ws")
+        assert await registry.get_owner("room-1") == ("a", "ws://a/ws")
+        assert await registry.get_owner("room-2") is None
+        assert not await registry.heartbeat("b", "ws://b/ws")
+        assert await registry.get_least_loaded_shard() == ("b", "ws://b/ws")
+        assert await registry.claim_room("room-2", "b", "ws://b/ws")
+        assert await registry.get_least_loaded_shard(prefer="b") == ("b", "ws://b/ws")
+        assert await registry.get_least_loaded_shard(prefer="a") == ("a", "ws://a/ws")
+        await registry.release_room("room-1")
+        assert await registry.get_owner("room-1") is None
+        assert await registry.claim_room("room-1", "b", "ws://b/ws")
+        await registry.remove_shard("b")
+        assert await registry.get_owner("room-2") is None
+
+    asyncio.run(run())
+
+
+def test_shards_expire_without_heartbeats(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(sharding.time, "monotonic", lambda: now[0])
+
+    async def run():
+        registry = InMemoryRegistry()
+        assert await registry.claim_room("room-1", "a", "ws://a/ws")
+        assert await registry.claim_room("room-2", "b", "ws://b/ws")
+        now[0] += InMemoryRegistry.SHARD_TTL - 1
+        assert await registry.heartbeat("b", "ws://b/ws")
+        now[0] += 2
+        assert await registry.get_owner("room-1") is None
+        assert await registry.get_owner("room-2") == ("b", "ws://b/ws")
+        assert await registry.get_least_loaded_shard(prefer="a") == ("b", "ws://b/ws")
+        assert not await registry.heartbeat("a", "ws://a/ws")
+
+    asyncio.run(run())
+
+
+def test_socket_registry_fails_over_when_the_server_closes(tmp_path):
+    async def run():
+        path = str(tmp_path / "registry.sock")
+        first, second = SocketRegistry(path), SocketRegistry(path)
+        assert not await first.heartbeat("a", "ws://a/ws")
+        assert not await second.heartbeat("b", "ws://b/ws")
+        assert first.server is not None and second.server is None
+        assert await first.claim_room("room-1", "a", "ws://a/ws")
+        assert not await second.claim_room("room-1", "b", "ws://b/ws")
+        assert await second.get_owner("room-1") == ("a", "ws://a/ws")
+        await first.close()
+        assert not await second.heartbeat("b", "ws://b/ws")
+        assert second.server is not None
+        assert await second.get_owner("room-1") is None
+        assert await second.claim_room("room-1", "b", "ws://b/ws")
+        assert await second.get_least_loaded_shard() == ("b", "ws://b/ws")
+        await second.close()
+
+    asyncio.run(run())
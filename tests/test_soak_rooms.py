@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app import PlayerConnection, manager
+from benchmarks.soak_rooms import cycle
+from ids import IdAllocator
+
+
+def tracked(monkeypatch, allocator):
+    allocated = []
+    allocate = allocator.allocate
+
+    def wrapper():
+        user_id = allocate()
+        assert user_id not in allocator.in_use
+        allocated.append(user_id)
+        return user_id
+
+    monkeypatch.setattr(allocator, "allocate", wrapper)
+    return allocated
+
+
+def test_rooms_and_user_ids_stay_bounded(monkeypatch):
+    room_ids = tracked(monkeypatch, manager.room_ids)
+    user_ids = tracked(monkeypatch, PlayerConnection.user_ids)
+
+    rooms, users = len(manager.game_rooms), len(PlayerConnection.by_user_id)
+
+    async def run():
+        await manager.register_shard()
+        rooms_alive = []
+        for _ in range(10000):
+            await cycle(rooms_alive, players=2)
+            assert len(manager.game_rooms) <= rooms + 101
+            assert len(PlayerConnection.by_user_id) <= users + 101 * 2
+        for game_id in rooms_alive:
+            await manager.delete_game_room(game_id)
+
+    asyncio.run(run())
+    assert len(manager.game_rooms) == rooms and len(PlayerConnection.by_user_id) == users
+    assert len(room_ids) == 10000 and len(user_ids) == 20000
+
+
+def test_ids_are_reused_only_after_release():
+    in_use = {}
+    allocator = IdAllocator(in_use, digits=2, seed=0)
+    for _ in range(100):
+        in_use[allocator.allocate()] = True
+    assert sorted(in_use) == [str(i).zfill(2) for i in range(100)]
+    with pytest.raises(RuntimeError):
+        allocator.allocate()
+    del in_use["42"]
+    assert allocator.allocate() == "42"
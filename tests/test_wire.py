@@ -0,0 +1,93 @@
+import random
+
+import orjson
+import pytest
+
+from game import Game, BotMove, InvalidMove
+from wire import (BOARD_BYTES, FRAME_HEADER, GAME_DELTA, GAME_STATE, MOVE, decode_client_frame, encode_game_delta,
+                  encode_game_state, pack_board, pack_path)
+
+
+def random_game(seed, players, plies):
+    random.seed(seed)
+    game = Game(players)
+    for _ in range(plies):
+        game.make_moves(random.choice(BotMove(game).get_all_possible_moves()))
+    return game
+
+
+def unpack_board(data):
+    packed = int.from_bytes(data, "little")
+    board = [[0] * Game.BOARD_SIZE for _ in range(Game.BOARD_SIZE)]
+    for cell, (x, y) in enumerate(Game.CELLS):
+        board[x][y] = packed >> cell * 3 & 7
+    return board
+
+
+def read_path(data):
+    return [list(Game.CELLS[cell]) for cell in data[1:1 + data[0]]], data[1 + data[0]:]
+
+
+def split_frame(frame):
+    kind, length = FRAME_HEADER.unpack_from(frame)
+    header_end = FRAME_HEADER.size + length
+    return kind, orjson.loads(frame[FRAME_HEADER.size:header_end]), frame[header_end:]
+
+
+def multi_hop_game():
+    for seed in range(100):
+        game = random_game(seed, [1, 4], 10)
+        bot = BotMove(game)
+        paths = [bot.get_path(*endpoint) for endpoint in bot.get_all_possible_endpoints()]
+        paths = [path for path in paths if len(path) > 2]
+        if paths:
+            return game, paths[0]
+
+
+@pytest.mark.parametrize("players", [[1, 4], [1, 3, 5], [1, 2, 3, 4, 5, 6]])
+def test_board_round_trip(players):
+    game = random_game(0, players, 30)
+    data = pack_board(game)
+    assert len(data) == BOARD_BYTES
+    assert unpack_board(data) == game.board
+
+
+def test_game_state_frame():
+    game, path = multi_hop_game()
+    game.make_moves(path)
+    kind, header, body = split_frame(encode_game_state({"type": "game_state", "seq": 3}, game))
+    assert kind == GAME_STATE and header == {"type": "game_state", "seq": 3}
+    assert body[0] == 1
+    assert unpack_board(body[1:1 + BOARD_BYTES]) == game.board
+    assert read_path(body[1 + BOARD_BYTES:]) == ([list(move) for move in path], b"")
+    assert split_frame(encode_game_state({"type": "game_state"}, None))[2] == b"\x00"
+
+
+def test_game_delta_frame():
+    kind, header, body = split_frame(encode_game_delta({"seq": 4}, {5: 1, 17: 0}, [[4, 2], [4, 4], [6, 6]]))
+    assert kind == GAME_DELTA and header == {"seq": 4}
+    assert body[:5] == bytes([2, 5, 1, 17, 0])
+    assert read_path(body[5:]) == ([[4, 2], [4, 4], [6, 6]], b"")
+
+
+def test_multi_hop_move_frame_round_trip():
+    game, path = multi_hop_game()
+    data = decode_client_frame(bytes([MOVE]) + pack_path(path)[1:])
+    assert data == {"type": "move", "cells": [Game.cell_id(x, y) for x, y in path]}
+    expected = Game.from_snapshot(game.to_snapshot())
+    expected.make_moves(path)
+    game.make_cell_moves(data["cells"])
+    assert game.board == expected.board
+    assert game.prev_moves == [list(move) for move in path]
+
+
+@pytest.mark.parametrize("frame", [b"", b"\x00", bytes([GAME_STATE, 1, 2]), b"\xff\x01"])
+def test_unknown_frames_are_rejected(frame):
+    assert decode_client_frame(frame) == {"type": None}
+
+
+@pytest.mark.parametrize("cells", [[len(Game.CELLS), 0], [0], [0, 100], [Game.cell_id(4, 2), Game.cell_id(4, 6)]])
+def test_malformed_move_frames_are_invalid(cells):
+    data = decode_client_frame(bytes([MOVE, *cells]))
+    with pytest.raises(InvalidMove):
+        Game([1, 4]).make_cell_moves(data["cells"])
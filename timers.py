@@ -0,0 +1,88 @@
+import asyncio
+import math
+
+
+class Timer:
+    __slots__ = ("tick", "callback", "args", "slot")
+
+    def __init__(self, callback, args):
+        self.tick = None
+        self.callback = callback
+        self.args = args
+        self.slot = None
+
+    @property
+    def pending(self):
+        return self.slot is not None
+
+
+class TimerWheel:
+    def __init__(self, resolution=0.1, size=1024):
+        self.resolution = resolution
+        self.slots = [{} for _ in range(size)]
+        self.tick = 0
+        self.origin = None
+        self.count = 0
+        self.wakeup = None
+        self.task = None
+
+    def __len__(self):
+        return self.count
+
+    def start(self):
+        if self.task is None:
+            self.origin = asyncio.get_running_loop().time()
+            self.tick = 0
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def current_tick(self):
+        return int((asyncio.get_running_loop().time() - self.origin) / self.resolution)
+
+    def schedule(self, delay, callback, *args):
+        timer = Timer(callback, args)
+        self.reschedule(timer, delay)
+        return timer
+
+    def reschedule(self, timer, delay):
+        self.start()
+        self.cancel(timer)
+        timer.tick = max(self.current_tick(), self.tick) + max(1, math.ceil(delay / self.resolution))
+        timer.slot = self.slots[timer.tick % len(self.slots)]
+        timer.slot[timer] = None
+        self.count += 1
+        self.wakeup.set()
+
+    def cancel(self, timer):
+        if timer is None or timer.slot is None:
+            return
+        del timer.slot[timer]
+        timer.slot = None
+        self.count -= 1
+
+    def advance(self, now):
+        first = self.tick + 1
+        for tick in range(first, min(now, first + len(self.slots) - 1) + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for timer in [timer for timer in slot if timer.tick <= now]:
+                self.cancel(timer)
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    asyncio.get_running_loop().call_exception_handler({"message": "Timer callback failed",
+                                                                       "exception": e})
+        self.tick = max(self.tick, now)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.count == 0:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+            await asyncio.sleep(max(0.0, self.origin + (self.tick + 1) * self.resolution - loop.time()))
+            self.advance(self.current_tick())
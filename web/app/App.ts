@@ -42,9 +42,8 @@ const s = (p5): void => {
     p5.setup = (): void => {
         p5.createCanvas(DisplayConstants.CANVAS_WIDTH, DisplayConstants.CANVAS_HEIGHT);
         p5.webSocketIO = new WebSocketIO(
-            location.href.replace('http://', 'ws://')
-                .replace('https://', 'wss://')
-            + 'ws'
+            (location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + location.pathname + 'ws',
+            new URLSearchParams(location.search).get('binary') === '1'
         );
         p5.menuMediator = new MenuMediator();
         p5.lobbyMediator = new LobbyMediator();
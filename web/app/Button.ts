@@ -158,6 +158,22 @@ export class Button extends MouseInteractionHandler implements Displayable, Clic
     }
 }
 
+export class ToggleButton extends Button {
+    private selected: boolean = false;
+
+    setSelected(selected: boolean): void {
+        this.selected = selected;
+    }
+
+    display(): void {
+        if (this.mouseIsHovering()) this.p5.cursor("pointer");
+        for (const displayer: ButtonDisplayer of this.displayerArr) {
+            displayer.setButtonState(this.selected ? ButtonState.PRESSED : this.getButtonState());
+            displayer.display();
+        }
+    }
+}
+
 export class BoardButton extends Button {
     constructor(private gameCoordinate: GameCoordinate, player: Player, mediator: Mediator, private active: boolean) {
         const displayCoordinate: DisplayCoordinate = gameCoordinate.toDisplayCoordinate();
@@ -98,7 +98,7 @@ export class GameCoordinate extends Pair {
             this.LIMITS[coordinate.x][0] <= coordinate.y && coordinate.y < this.LIMITS[coordinate.x][1];
     }
 
-    private static allValid(): GameCoordinate[] {
+    static allValid(): GameCoordinate[] {
         let validCoordinates: GameCoordinate[] = [];
         for (let i = 0; i < this.BOARD_SIZE; i++) {
             for (let j = this.LIMITS[i][0]; j < this.LIMITS[i][1]; j++) {
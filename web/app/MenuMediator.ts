@@ -1,5 +1,5 @@
 import {Mediator} from "./Mediator";
-import {Button, ButtonTextDisplayer, RectangleButtonDisplayer, TriangleButtonDisplayer} from "./Button";
+import {Button, ButtonTextDisplayer, RectangleButtonDisplayer, ToggleButton, TriangleButtonDisplayer} from "./Button";
 import {BackgroundDisplayer} from "./BackgroundDisplayer";
 import {TitleDisplayer} from "./TitleDisplayer";
 import {ButtonSeparatorDisplayer} from "./ButtonSeparatorDisplayer";
@@ -27,7 +27,9 @@ export class MenuMediator implements Mediator {
     private readonly backButton: Button;
     private readonly nameErrorMessage: ErrorTextDisplayer;
     private readonly invalidGameCodeErrorMessage: ErrorTextDisplayer;
+    private readonly difficultyButtons: Map<string, ToggleButton> = new Map();
     private actionType: string = "";
+    private difficulty: string = "easy";
 
     constructor() {
         this.p5 = P5Singleton.getInstance();
@@ -112,6 +114,19 @@ export class MenuMediator implements Mediator {
             DisplayCoordinate.fromCoordinates(400, 530),
             "Invalid game code!"
         );
+
+        const difficulties: string[][] = [["easy", "Easy bots"], ["medium", "Medium bots"], ["hard", "Hard bots"]];
+        difficulties.forEach(([difficulty, text]: string[], i: number): void => {
+            const difficultyButtonGeometry: RectangleGeometry = new RectangleGeometry(
+                DisplayCoordinate.fromCoordinates(200 + i * 137, 280),
+                DisplayCoordinate.fromCoordinates(326 + i * 137, 330)
+            );
+            this.difficultyButtons.set(difficulty, new ToggleButton(difficultyButtonGeometry, [
+                    new RectangleButtonDisplayer(difficultyButtonGeometry),
+                    new ButtonTextDisplayer(difficultyButtonGeometry, text, 22)
+                ], this
+            ));
+        });
     }
 
     enable(): void {
@@ -133,6 +148,10 @@ export class MenuMediator implements Mediator {
             } else {
                 this.p5.drawer.add(this.gameCodeErrorMessage);
             }
+        } else if (sender instanceof ToggleButton) {
+            this.difficultyButtons.forEach((button: ToggleButton, difficulty: string): void => {
+                if (button === sender) this.selectDifficulty(difficulty);
+            });
         } else if (sender === this.backButton) {
             this.switchToMainScreen();
             this.p5.drawer.remove(this.nameErrorMessage);
@@ -143,7 +162,7 @@ export class MenuMediator implements Mediator {
                 this.p5.drawer.remove(this.invalidGameCodeErrorMessage);
             } else {
                 if (this.actionType === "create") {
-                    this.p5.webSocketIO.sendCreateGame(this.nameInputBar.getText());
+                    this.p5.webSocketIO.sendCreateGame(this.nameInputBar.getText(), this.difficulty);
                 } else if (this.actionType === "join") {
                     this.p5.webSocketIO.sendJoinGame(this.gameCodeInputBar.getText(), this.nameInputBar.getText());
                 }
@@ -161,9 +180,17 @@ export class MenuMediator implements Mediator {
     reset(): void {
         this.gameCodeInputBar.reset();
         this.nameInputBar.reset();
+        this.selectDifficulty("easy");
         this.switchToMainScreen();
     }
 
+    private selectDifficulty(difficulty: string): void {
+        this.difficulty = difficulty;
+        this.difficultyButtons.forEach((button: ToggleButton, value: string): void => {
+            button.setSelected(value === difficulty);
+        });
+    }
+
     private switchToMainScreen(): void {
         this.disableAllComponents();
         this.p5.drawer.add(this.backgroundDisplayer);
@@ -194,6 +221,12 @@ export class MenuMediator implements Mediator {
         this.p5.mousePublisher.add(this.enterLobbyButton);
         this.p5.mousePublisher.add(this.nameInputBar);
         this.p5.keyPressedPublisher.add(this.nameInputBar);
+        if (this.actionType === "create") {
+            for (const button: ToggleButton of this.difficultyButtons.values()) {
+                this.p5.drawer.add(button);
+                this.p5.mousePublisher.add(button);
+            }
+        }
     }
 
     private disableAllComponents(): void {
@@ -211,6 +244,10 @@ export class MenuMediator implements Mediator {
         this.p5.drawer.remove(this.gameCodeErrorMessage);
         this.p5.drawer.remove(this.nameErrorMessage);
         this.p5.drawer.remove(this.invalidGameCodeErrorMessage);
+        for (const button: ToggleButton of this.difficultyButtons.values()) {
+            this.p5.drawer.remove(button);
+            this.p5.mousePublisher.remove(button);
+        }
 
         this.p5.mousePublisher.remove(this.createGameButton);
         this.p5.mousePublisher.remove(this.joinGameButton);
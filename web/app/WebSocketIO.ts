@@ -1,6 +1,7 @@
 import {P5Singleton} from "./App";
 import {Player} from "./Constants";
 import {CookieManager} from "./CookieManager";
+import {GameCoordinate} from "./Coordinate";
 
 export interface Connection {
     name: string;
@@ -13,6 +14,7 @@ export interface LobbyMessage {
     id: string;
     type: string;
     status: number;
+    difficulty: string;
     user_id: string;
     color: Player;
     connections: Connection[];
@@ -21,23 +23,57 @@ export interface LobbyMessage {
 export interface GameMessage {
     id: string; // Game id
     type: string; // should always be "game_state"
+    seq: number; // sequence number of this state within the room
     board: Player[][]; // 17x17 grid representing the board
     players: Player[]; // list of players in the game
     turn: number; // index of the current player in `players`
     status: number; // 0 if in lobby, 1 if in game, 2 if game over
+    difficulty: string; // "easy", "medium" or "hard", how far ahead the bots search
     prev_moves: number[][]; // array of length 2 arrays representing the most recent move
     connections: Connection[];
-    user_id: string; // unique code for the current user, allows for reconnections
-    color: Player; // current player color
+    user_id: string; // unique code for the current user, allows for reconnections, copied from IdentityMessage
+    color: Player; // current player color, copied from IdentityMessage
+}
+
+export interface IdentityMessage {
+    type: string; // should always be "identity", sent before any state that it applies to
+    user_id: string;
+    color: Player;
+}
+
+export interface GameDeltaMessage {
+    id: string; // Game id
+    type: string; // should always be "game_delta"
+    seq: number; // must be exactly one more than the seq of the state it applies to
+    turn: number;
+    status: number;
+    prev_moves: number[][];
+    cells: number[][]; // array of [x, y, player] for every cell that changed
+    connections?: Connection[]; // full list, only sent if players were added or removed
+    connection_changes?: [number, Partial<Connection>][]; // changed fields by index in `connections`
 }
 
 export class WebSocketIO {
+    // binary frames are [kind: u8][header length: u16 LE][JSON header][body], see README
+    static readonly BINARY_SUBPROTOCOL: string = "cc-binary-v1";
+    private static readonly GAME_STATE: number = 1;
+    private static readonly GAME_DELTA: number = 2;
+    private static readonly MOVE: number = 3;
+    private static readonly CELLS: GameCoordinate[] = GameCoordinate.allValid();
+    private static readonly CELL_ID: Map<string, number> = new Map(
+        WebSocketIO.CELLS.map((cell, i): [string, number] => [`${cell.x},${cell.y}`, i])
+    );
+    private static readonly BOARD_BYTES: number = Math.ceil(WebSocketIO.CELLS.length * 3 / 8);
+
     private websocket: WebSocket;
     private numReconnectAttempts: number = 0;
     private lastReconnectAttempt: Date = new Date(0);
+    private state: any = null;
+    private identity: IdentityMessage = null;
+    private syncRequested: boolean = false;
     private p5: any;
 
-    constructor(private websocketURL: string) {
+    constructor(private websocketURL: string, private binary: boolean = false) {
         this.p5 = P5Singleton.getInstance();
     }
 
@@ -50,7 +86,8 @@ export class WebSocketIO {
         const timeDifferenceSeconds: number = (new Date().getTime() - this.lastReconnectAttempt.getTime()) / 1000;
         if (timeDifferenceSeconds < 3 || this.numReconnectAttempts >= 3) return;
 
-        this.websocket = new WebSocket(this.websocketURL);
+        this.websocket = new WebSocket(this.websocketURL, this.binary ? [WebSocketIO.BINARY_SUBPROTOCOL] : []);
+        this.websocket.binaryType = "arraybuffer";
         // does not work when `this.websocket.onopen = this.onopen;`
         this.websocket.onopen = (): void => this.onopen();
         this.websocket.onmessage = (event: MessageEvent) => this.onmessage(event);
@@ -64,12 +101,15 @@ export class WebSocketIO {
 
     private onopen(): void {
         this.numReconnectAttempts = 0;
+        this.state = null;
+        this.identity = null;
+        this.syncRequested = false;
         this.p5.switchToMenu();
         this.sendReconnectGame(CookieManager.get("gameCode"), CookieManager.get("userId"));
     }
 
     private onmessage(event: MessageEvent): void {
-        const msg = JSON.parse(event.data);
+        const msg = event.data instanceof ArrayBuffer ? WebSocketIO.decodeBinary(event.data) : JSON.parse(event.data);
         if (msg.type === "status") {
             if (msg.status === "InvalidWebSocketAction: Game does not exist") {
                 this.p5.switchToMenu();
@@ -78,14 +118,93 @@ export class WebSocketIO {
                 this.websocket.close();
                 this.numReconnectAttempts = 10;
             }
+        } else if (msg.type === "identity") {
+            this.identity = msg as IdentityMessage;
         } else if (msg.type === "game_state") {
-            if (msg.status === 0) { // lobby
-                this.p5.switchToLobby();
-                this.p5.lobbyMediator.notify(this, msg);
-            } else { // game
-                this.p5.switchToGame();
-                this.p5.gameMediator.notify(this, msg);
+            this.state = msg;
+            this.syncRequested = false;
+            this.notifyGameState();
+        } else if (msg.type === "game_delta") {
+            if (this.state === null || this.state.id !== msg.id || msg.seq !== this.state.seq + 1) {
+                if (!this.syncRequested) this.sendSyncGame();
+                this.syncRequested = true;
+                return;
+            }
+            this.applyGameDelta(msg as GameDeltaMessage);
+            this.notifyGameState();
+        }
+    }
+
+    private binaryNegotiated(): boolean {
+        return this.websocket.protocol === WebSocketIO.BINARY_SUBPROTOCOL;
+    }
+
+    private static decodeBinary(buffer: ArrayBuffer): any {
+        const bytes = new Uint8Array(buffer);
+        const kind = bytes[0];
+        const headerLength = bytes[1] | (bytes[2] << 8);
+        const msg = JSON.parse(new TextDecoder().decode(bytes.subarray(3, 3 + headerLength)));
+        let offset = 3 + headerLength;
+        if (kind === WebSocketIO.GAME_STATE) {
+            if (bytes[offset++] === 1) {
+                msg.board = WebSocketIO.unpackBoard(bytes.subarray(offset, offset + WebSocketIO.BOARD_BYTES));
+                offset += WebSocketIO.BOARD_BYTES;
+                msg.prev_moves = WebSocketIO.readPath(bytes, offset);
+            }
+        } else if (kind === WebSocketIO.GAME_DELTA) {
+            const count = bytes[offset++];
+            msg.cells = [];
+            for (let i = 0; i < count; i++, offset += 2) {
+                const cell = WebSocketIO.CELLS[bytes[offset]];
+                msg.cells.push([cell.x, cell.y, bytes[offset + 1]]);
             }
+            msg.prev_moves = WebSocketIO.readPath(bytes, offset);
+        }
+        return msg;
+    }
+
+    private static unpackBoard(packed: Uint8Array): Player[][] {
+        const board: Player[][] = Array.from({length: 17}, () => new Array(17).fill(Player.SPECTATOR));
+        WebSocketIO.CELLS.forEach((cell, i) => {
+            const bit = i * 3;
+            const pair = packed[bit >> 3] | ((packed[(bit >> 3) + 1] ?? 0) << 8);
+            board[cell.x][cell.y] = (pair >> (bit & 7)) & 7;
+        });
+        return board;
+    }
+
+    private static readPath(bytes: Uint8Array, offset: number): number[][] {
+        const path: number[][] = [];
+        for (let i = 1; i <= bytes[offset]; i++) {
+            const cell = WebSocketIO.CELLS[bytes[offset + i]];
+            path.push([cell.x, cell.y]);
+        }
+        return path;
+    }
+
+    private applyGameDelta(delta: GameDeltaMessage): void {
+        for (const [x, y, player] of delta.cells) {
+            this.state.board[x][y] = player;
+        }
+        if (delta.connections) this.state.connections = delta.connections;
+        for (const [index, fields] of delta.connection_changes ?? []) {
+            Object.assign(this.state.connections[index], fields);
+        }
+        this.state.seq = delta.seq;
+        this.state.turn = delta.turn;
+        this.state.status = delta.status;
+        this.state.prev_moves = delta.prev_moves;
+    }
+
+    private notifyGameState(): void {
+        this.state.user_id = this.identity.user_id;
+        this.state.color = this.identity.color;
+        if (this.state.status === 0) { // lobby
+            this.p5.switchToLobby();
+            this.p5.lobbyMediator.notify(this, this.state);
+        } else { // game
+            this.p5.switchToGame();
+            this.p5.gameMediator.notify(this, this.state);
         }
     }
 
@@ -97,9 +216,10 @@ export class WebSocketIO {
         }
     }
 
-    sendCreateGame = (name: string) => this.sendObject({
+    sendCreateGame = (name: string, difficulty: string = "easy") => this.sendObject({
         "type": "create",
-        "name": name
+        "name": name,
+        "difficulty": difficulty
     });
     sendJoinGame = (gameId: string, name: string) => this.sendObject({
         "type": "join",
@@ -111,6 +231,10 @@ export class WebSocketIO {
         "game_id": gameId,
         "user_id": userId
     });
+    sendSpectateGame = (gameId: string) => this.sendObject({
+        "type": "spectate",
+        "game_id": gameId
+    });
     sendSelectColor = (color: string) => this.sendObject({
         "type": "select_color",
         "color": color
@@ -126,8 +250,19 @@ export class WebSocketIO {
     sendStartGame = () => this.sendObject({
         "type": "start"
     });
-    sendMakeMove = (moves: any[]) => this.sendObject({
-        "type": "move",
-        "moves": moves
+    sendMakeMove = (moves: number[][]) => {
+        if (this.connected() && this.binaryNegotiated()) {
+            this.websocket.send(new Uint8Array(
+                [WebSocketIO.MOVE, ...moves.map(([x, y]) => WebSocketIO.CELL_ID.get(`${x},${y}`))]
+            ));
+        } else {
+            this.sendObject({
+                "type": "move",
+                "moves": moves
+            });
+        }
+    };
+    sendSyncGame = () => this.sendObject({
+        "type": "sync"
     });
 }
\ No newline at end of file
@@ -0,0 +1,50 @@
+import struct
+
+import orjson
+
+from game import Game
+
+BINARY_SUBPROTOCOL = "cc-binary-v1"
+GAME_STATE = 1
+GAME_DELTA = 2
+MOVE = 3
+FRAME_HEADER = struct.Struct("<BH")
+BOARD_BYTES = (len(Game.CELLS) * 3 + 7) // 8
+SPREAD = [sum(1 << i * 3 for i in range(8) if byte >> i & 1) for byte in range(256)]
+
+
+def pack_board(game: Game):
+    packed = 0
+    for player in game.players:
+        mask, shift = game.masks[player], 0
+        while mask:
+            packed |= SPREAD[mask & 0xFF] * player << shift
+            mask >>= 8
+            shift += 24
+    return packed.to_bytes(BOARD_BYTES, "little")
+
+
+def pack_path(moves):
+    return bytes([len(moves), *(Game.cell_id(x, y) for x, y in moves)])
+
+
+def encode_frame(kind, header, body):
+    header = orjson.dumps(header)
+    return FRAME_HEADER.pack(kind, len(header)) + header + body
+
+
+def encode_game_state(header, game: Game):
+    if game is None:
+        return encode_frame(GAME_STATE, header, b"\x00")
+    return encode_frame(GAME_STATE, header, b"\x01" + pack_board(game) + pack_path(game.prev_moves))
+
+
+def encode_game_delta(header, changed_cells, prev_moves):
+    cells = bytes([len(changed_cells), *(value for item in changed_cells.items() for value in item)])
+    return encode_frame(GAME_DELTA, header, cells + pack_path(prev_moves))
+
+
+def decode_client_frame(frame: bytes):
+    if len(frame) > 0 and frame[0] == MOVE:
+        return {"type": "move", "cells": list(frame[1:])}
+    return {"type": None}